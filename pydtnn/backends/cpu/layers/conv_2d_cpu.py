@@ -52,8 +52,11 @@ class Conv2DCPU(LayerCPU, Conv2D):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Output buffers for the NCHW i2c and depthwise variants (it will be modified in initialize())
+        self.y_cache = None
         # convGemm related attributes (some of them will be modified in initialize())
         self.cg = None
+        self.cg_dw_cache = None
         # convWinograd related attributes (some of them will be modified in initialize())
         self.cw = None
         self.cw_constraints_fulfilled = None
@@ -86,6 +89,8 @@ class Conv2DCPU(LayerCPU, Conv2D):
         # Set convGemm parameters
         if self.model.enable_conv_gemm:
             self.cg = ConvGemm(dtype=self.model.dtype, debug=self.debug, parent_layer=self)
+            # The weights shape does not change, so the dw matrix computed by the transposed convGemm is reused
+            self.cg_dw_cache = MemoryCache(lambda shape: np.empty(shape, self.model.dtype, order="C"))
         # Set forward and backward implementations
         variant = 'i2c'  # Use i2c as default
         if self.grouping == 'pointwise':
@@ -106,6 +111,7 @@ class Conv2DCPU(LayerCPU, Conv2D):
             if is_conv_gemm_available:
                 if self.cg is None:
                     self.cg = ConvGemm(dtype=self.model.dtype, debug=self.debug, parent_layer=self)
+                    self.cg_dw_cache = MemoryCache(lambda shape: np.empty(shape, self.model.dtype, order="C"))
             # Set forward alternatives
             alternatives_fw = [('i2c', self._get_class_forward_and_backward('i2c')[0])]
             if is_conv_gemm_available:
@@ -129,7 +135,8 @@ class Conv2DCPU(LayerCPU, Conv2D):
                 get_problem_size=lambda *args: tuple(list(args[0].shape) + list(args[0].weights.shape)),
             )
         elif self.model.enable_conv_winograd:
-            if cw_constraints_fulfilled:
+            # Winograd is only used if its transforms can be amortized, i.e., if the layer has enough channels
+            if cw_constraints_fulfilled and min(self.ci, self.co) >= self.model.conv_winograd_min_channels:
                 variant = 'cw'
             elif self.model.enable_conv_gemm:
                 variant = 'cg'
@@ -138,6 +145,10 @@ class Conv2DCPU(LayerCPU, Conv2D):
         elif self.model.enable_conv_gemm:
             variant = 'cg'
         self.cw_constraints_fulfilled = cw_constraints_fulfilled
+        # The NCHW i2c (also a best_of alternative) and depthwise outputs are transposed into a buffer that is reused
+        # for the same batch size
+        if self.model.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW and variant in ('i2c', 'depthwise', 'best_of'):
+            self.y_cache = MemoryCache(lambda shape: np.empty(shape, self.model.dtype, order="C"))
         forward, backward = self._get_forward_and_backward(variant)
         setattr(self, "forward", forward)
         setattr(self, "backward", backward)
@@ -285,7 +296,8 @@ class Conv2DCPU(LayerCPU, Conv2D):
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, 0)
 
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, self.id * PYDTNN_OPS_EVENTS + PYDTNN_OPS_FORWARD_RESHAPE_Y)
-        y = best_transpose_1023(y.reshape(self.co, -1, self.ho, self.wo))
+        y = best_transpose_1023(y.reshape(self.co, -1, self.ho, self.wo),
+                                self.y_cache[(x.shape[0], self.co, self.ho, self.wo)])
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, 0)
 
         return y
@@ -336,7 +348,8 @@ class Conv2DCPU(LayerCPU, Conv2D):
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, 0)
 
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, self.id * PYDTNN_OPS_EVENTS + PYDTNN_OPS_FORWARD_RESHAPE_Y)
-        y = best_transpose_1023(y.reshape(self.co, -1, self.ho, self.wo))
+        y = best_transpose_1023(y.reshape(self.co, -1, self.ho, self.wo),
+                                self.y_cache[(x.shape[0], self.co, self.ho, self.wo)])
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, 0)
         return y
 
@@ -400,7 +413,7 @@ class Conv2DCPU(LayerCPU, Conv2D):
         """Version of the backward function that uses the convGemm library"""
 
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, self.id * PYDTNN_OPS_EVENTS + PYDTNN_OPS_BACKWARD_CONVGEMM)
-        res = np.empty(self.weights.shape, dtype=dy.dtype)
+        res = self.cg_dw_cache[self.weights.shape]
         self.cg.conv_gemm_nhwc(dy, self.cg_x, biases=res,
                                vpadding=self.vpadding, hpadding=self.hpadding,
                                vstride=self.vstride, hstride=self.hstride,
@@ -483,7 +496,7 @@ class Conv2DCPU(LayerCPU, Conv2D):
     def _backward_nchw_cg(self, dy):
         """Version of the backward function that uses the convGemm library"""
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, self.id * PYDTNN_OPS_EVENTS + PYDTNN_OPS_BACKWARD_CONVGEMM)
-        res = np.empty(self.weights.shape, dtype=dy.dtype)
+        res = self.cg_dw_cache[self.weights.shape]
         self.cg.conv_gemm_nchw(dy, self.cg_x, biases=res,
                                vpadding=self.vpadding, hpadding=self.hpadding,
                                vstride=self.vstride, hstride=self.hstride,
@@ -25,6 +25,7 @@ from pydtnn.model import TRAIN_MODE
 from pydtnn.performance_models import matmul_time
 from pydtnn.tracers import PYDTNN_OPS_EVENT, PYDTNN_OPS_EVENTS, PYDTNN_OPS_COMP_DW_MATMUL, PYDTNN_OPS_COMP_DX_MATMUL, \
     PYDTNN_OPS_FORWARD_MATMUL
+from pydtnn.utils.memory_cache import MemoryCache
 
 
 class FCCPU(LayerCPU, FC):
@@ -34,6 +35,7 @@ class FCCPU(LayerCPU, FC):
         self.x = None
         self.dw = None
         self.db = None
+        self.dw_cache = None
 
     def initialize(self, prev_shape, need_dx=True):
         super().initialize(prev_shape, need_dx)
@@ -41,6 +43,8 @@ class FCCPU(LayerCPU, FC):
         if self.use_bias:
             self.biases = self.biases_initializer(self.shape, self.model.dtype)
         self.nparams = self.weights.size + (self.biases.size if self.use_bias else 0)
+        # The weights shape does not change, so the dw matrix is reused among iterations
+        self.dw_cache = MemoryCache(lambda shape: np.empty(shape, self.model.dtype, order="C"))
         # Performance model
         self.fwd_time = \
             matmul_time(m=self.model.batch_size, n=self.weights.shape[1], k=self.weights.shape[0],
@@ -60,11 +64,13 @@ class FCCPU(LayerCPU, FC):
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, self.id * PYDTNN_OPS_EVENTS + PYDTNN_OPS_FORWARD_MATMUL)
         res = self.model.matmul(x, self.weights)
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, 0)
-        return res + self.biases if self.use_bias else 0
+        if self.use_bias:
+            res += self.biases
+        return res
 
     def backward(self, dy):
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, self.id * PYDTNN_OPS_EVENTS + PYDTNN_OPS_COMP_DW_MATMUL)
-        self.dw = self.model.matmul(self.x.T, dy)
+        self.dw = self.model.matmul(self.x.T, dy, self.dw_cache[self.weights.shape])
         self.model.tracer.emit_event(PYDTNN_OPS_EVENT, 0)
 
         if self.use_bias:
@@ -28,6 +28,7 @@ import weakref
 import numpy as np
 
 from pydtnn.utils import load_library
+from pydtnn.utils.memory_cache import MemoryCache
 
 try:
    load_library("convGemm")
@@ -84,14 +85,16 @@ class ConvGemm:
                 raise AttributeError("dtype '{}' not recognized".format(dtype)) from None
         if ConvGemm.lib_cg is None:
             ConvGemm.lib_cg = load_library("convGemm")
+            _set_prototypes(ConvGemm.lib_cg)
 
         # Declare ac_pack and bc_pack and allocate space for them
         self.ac_pack = ctypes.POINTER(ctypes.c_float)()
         self.bc_pack = ctypes.POINTER(ctypes.c_float)()
-        self.lib_cg.alloc_pack_buffs.restype = ctypes.c_int
         result = self.lib_cg.alloc_pack_buffs(ctypes.byref(self.ac_pack), ctypes.byref(self.bc_pack))
         if result == 1:
             raise MemoryError("Could not allocate space for ac_pack or bc_pack!")
+        # The output matrices are cached (one per shape) on the current instance
+        self.y_cache = MemoryCache(lambda shape: np.empty(shape, self.dtype, order="C"))
         # Debug
         self.debug = debug
         # Parent layer
@@ -136,7 +139,7 @@ class ConvGemm:
         x : array_like
             The layers matrix (b x c x h x w).
         biases : array_like
-            An optional biases matrix (kn x b*ho*wo). If provided, can be overwritten.
+            An optional biases matrix (b x kn x ho x wo). If provided, can be overwritten.
         vpadding : int
             The vertical padding to be applied to the x matrix.
         hpadding : int
@@ -157,7 +160,9 @@ class ConvGemm:
         Returns
         -------
         array_like
-            The result of weights * im2col(x)
+            The result of weights * im2col(x). If biases is not supplied, it is stored in an output matrix that is
+            cached by this instance for its shape (while the memory cache is enabled), so it will be overwritten by
+            the next call with the same output shape. It must be copied if it has to be kept.
         """
 
         # Get matrices dimensions
@@ -167,9 +172,9 @@ class ConvGemm:
             if biases is None:
                 ho = (h + 2 * vpadding - vdilation * (kh - 1) - 1) // vstride + 1
                 wo = (w + 2 * hpadding - hdilation * (kw - 1) - 1) // hstride + 1
-                biases = np.empty((b, kn, ho, wo), weights.dtype, order="C")
+                biases = self.y_cache[(b, kn, ho, wo)]
             else:
-                bb, ho, wo, knb = biases.shape
+                bb, knb, ho, wo = biases.shape
                 assert kn == knb, "Number of filters must be the same!"
                 assert b == bb, "Batch size must be the same!"
         else:
@@ -187,28 +192,66 @@ class ConvGemm:
             "The input matrices must have the same type of data as the one specified when " \
             "this class was instantiated!"
 
+        # libconvGemm expects C-contiguous matrices (already contiguous matrices are not copied)
+        weights, x = np.ascontiguousarray(weights), np.ascontiguousarray(x)
+
         # Call the appropriate convGemm function from libconvGemm
-        self.x_conv_gemm_nchw(ctypes.c_char(b'Y' if trans else b'N'),
-                         ctypes.c_uint(b), ctypes.c_uint(c), ctypes.c_uint(h), ctypes.c_uint(w),
-                         ctypes.c_uint(kn), ctypes.c_uint(kh), ctypes.c_uint(kw),
-                         ctypes.c_uint(vpadding), ctypes.c_uint(hpadding),
-                         ctypes.c_uint(vstride), ctypes.c_uint(hstride),
-                         ctypes.c_uint(vdilation), ctypes.c_uint(hdilation),
-                         ctypes.c_void_p(weights.ctypes.data),
-                         ctypes.c_void_p(x.ctypes.data),
-                         ctypes.c_void_p(biases.ctypes.data),
-                         ctypes.c_void_p(None if biases_vector is None else biases_vector.ctypes.data),
-                         ctypes.c_void_p(None if bn_running_mean is None else bn_running_mean.ctypes.data),
-                         ctypes.c_void_p(None if bn_inv_std is None else bn_inv_std.ctypes.data),
-                         ctypes.c_void_p(None if bn_gamma  is None else bn_gamma.ctypes.data),
-                         ctypes.c_void_p(None if bn_beta is None else bn_beta.ctypes.data), ctypes.c_bool(relu),
-                         self.ac_pack, self.bc_pack)
+        self.x_conv_gemm_nchw(b'Y' if trans else b'N',
+                              b, c, h, w, kn, kh, kw,
+                              vpadding, hpadding, vstride, hstride, vdilation, hdilation,
+                              weights.ctypes.data, x.ctypes.data, biases.ctypes.data,
+                              None if biases_vector is None else biases_vector.ctypes.data,
+                              None if bn_running_mean is None else bn_running_mean.ctypes.data,
+                              None if bn_inv_std is None else bn_inv_std.ctypes.data,
+                              None if bn_gamma is None else bn_gamma.ctypes.data,
+                              None if bn_beta is None else bn_beta.ctypes.data, relu,
+                              self.ac_pack, self.bc_pack)
 
         return biases
 
     def conv_gemm_nhwc(self, weights, x, biases=None, vpadding=0, hpadding=0, vstride=1, hstride=1,
                   vdilation=1, hdilation=1, biases_vector=None, trans=False,bn_running_mean=None, bn_inv_std=None,
                   bn_gamma=None, bn_beta=None, relu=False):
+        """
+        Calls the appropriate convGemm function from libconvGemm.so to perform a
+        matrix matrix multiplication with an implicit im2row.
+
+        The padding is not applied to x beforehand. Instead, vpadding and hpadding
+        are forwarded to libconvGemm, which fills the out of bounds elements with
+        zeros while packing the x matrix.
+
+        Parameters
+        ----------
+        weights : array_like
+            The weights matrix (c x kh x kw x kn).
+        x : array_like
+            The layers matrix (b x h x w x c).
+        biases : array_like
+            An optional biases matrix (b x ho x wo x kn). If provided, can be overwritten.
+        vpadding : int
+            The vertical padding to be applied to the x matrix.
+        hpadding : int
+            The horizontal padding to be applied to the x matrix.
+        vstride : int
+            The vertical stride.
+        hstride : int
+            The horizontal stride.
+        vdilation : int
+            The vertical dilation.
+        hdilation : int
+            The horizontal dilation.
+        biases_vector: array_like
+            The biases that have to be summed to all the elements in each output channel.
+        trans: bool
+            Perform the im2row(x) if False, or the im2rowT(x) if True.
+
+        Returns
+        -------
+        array_like
+            The result of im2row(x) * weights. If biases is not supplied, it is stored in an output matrix that is
+            cached by this instance for its shape (while the memory cache is enabled), so it will be overwritten by
+            the next call with the same output shape. It must be copied if it has to be kept.
+        """
 
         b, h, w, c = x.shape
 
@@ -217,7 +260,7 @@ class ConvGemm:
             if biases is None:
                 ho = (h + 2 * vpadding - vdilation * (kh - 1) - 1) // vstride + 1
                 wo = (w + 2 * hpadding - hdilation * (kw - 1) - 1) // hstride + 1
-                biases = np.empty((b, ho, wo, kn), weights.dtype, order="C")
+                biases = self.y_cache[(b, ho, wo, kn)]
             else:
                 bb, ho, wo, knb = biases.shape
                 assert kn == knb, "Number of filters must be the same!"
@@ -231,21 +274,19 @@ class ConvGemm:
 
         assert ck == c, "Number of channels in weights and x should be the same!"
 
-        self.x_conv_gemm_nhwc(ctypes.c_char(b'Y' if trans else b'N'),
-                         ctypes.c_uint(b), ctypes.c_uint(h), ctypes.c_uint(w), ctypes.c_uint(c),
-                         ctypes.c_uint(kn), ctypes.c_uint(kh), ctypes.c_uint(kw),
-                         ctypes.c_uint(vpadding), ctypes.c_uint(hpadding),
-                         ctypes.c_uint(vstride), ctypes.c_uint(hstride),
-                         ctypes.c_uint(vdilation), ctypes.c_uint(hdilation),
-                         ctypes.c_void_p(weights.ctypes.data),
-                         ctypes.c_void_p(x.ctypes.data),
-                         ctypes.c_void_p(biases.ctypes.data),
-                         ctypes.c_void_p(None if biases_vector is None else biases_vector.ctypes.data),
-                         ctypes.c_void_p(None if bn_running_mean is None else bn_running_mean.ctypes.data),
-                         ctypes.c_void_p(None if bn_inv_std is None else bn_inv_std.ctypes.data),
-                         ctypes.c_void_p(None if bn_gamma  is None else bn_gamma.ctypes.data),
-                         ctypes.c_void_p(None if bn_beta is None else bn_beta.ctypes.data), ctypes.c_bool(relu),
-                         self.ac_pack, self.bc_pack)
+        # libconvGemm expects C-contiguous matrices (already contiguous matrices are not copied)
+        weights, x = np.ascontiguousarray(weights), np.ascontiguousarray(x)
+
+        self.x_conv_gemm_nhwc(b'Y' if trans else b'N',
+                              b, h, w, c, kn, kh, kw,
+                              vpadding, hpadding, vstride, hstride, vdilation, hdilation,
+                              weights.ctypes.data, x.ctypes.data, biases.ctypes.data,
+                              None if biases_vector is None else biases_vector.ctypes.data,
+                              None if bn_running_mean is None else bn_running_mean.ctypes.data,
+                              None if bn_inv_std is None else bn_inv_std.ctypes.data,
+                              None if bn_gamma is None else bn_gamma.ctypes.data,
+                              None if bn_beta is None else bn_beta.ctypes.data, relu,
+                              self.ac_pack, self.bc_pack)
 
         return biases
 
@@ -296,20 +337,52 @@ class ConvGemm:
         assert b == b2, "Different batch size!"
         assert ck == c, "Number of channels in weights and x should be the same!"
 
-        self.x_deconv_gemm_nchw(ctypes.c_uint(b), ctypes.c_uint(c), ctypes.c_uint(h), ctypes.c_uint(w),
-                           ctypes.c_uint(kn), ctypes.c_uint(kh), ctypes.c_uint(kw),
-                           ctypes.c_uint(vstride), ctypes.c_uint(hstride),
-                           ctypes.c_uint(vpadding), ctypes.c_uint(hpadding),
-                           ctypes.c_uint(vdilation), ctypes.c_uint(hdilation),
-                           ctypes.c_void_p(weights.ctypes.data),
-                           ctypes.c_void_p(dy.ctypes.data),
-                           ctypes.c_void_p(dx.ctypes.data),
-                           self.ac_pack, self.bc_pack)
+        # libconvGemm expects C-contiguous matrices (already contiguous matrices are not copied)
+        weights, dy = np.ascontiguousarray(weights), np.ascontiguousarray(dy)
+
+        self.x_deconv_gemm_nchw(b, c, h, w, kn, kh, kw,
+                                vstride, hstride, vpadding, hpadding, vdilation, hdilation,
+                                weights.ctypes.data, dy.ctypes.data, dx.ctypes.data,
+                                self.ac_pack, self.bc_pack)
 
         return dx
 
     def deconv_gemm_nhwc(self, weights, dy, dx, vpadding=0, hpadding=0,
                     vstride=1, hstride=1, vdilation=1, hdilation=1):
+        """
+        Calls the appropriate deconv_gemm function from libconvGemm.so to perform
+        an inplace matrix matrix multiplication and deconvolution:
+
+            dx = row2im(dy_2D * weights_2D_T),
+
+        As in conv_gemm_nhwc(), the padding is handled by libconvGemm itself.
+
+        Parameters
+        ----------
+        weights : array_like
+            The weights matrix (c x kh x kw x kn).
+        dy : array_like
+            The dy matrix (b x ho x wo x kn).
+        dx : array_like
+            An empty dx matrix (b x h x w x c) that will be overwritten with row2im(dy_2D * weights_2D_T).
+        vpadding : int
+            The vertical padding to be applied to the x matrix.
+        hpadding : int
+            The horizontal padding to be applied to the x matrix.
+        vstride : int
+            The vertical stride.
+        hstride : int
+            The horizontal stride.
+        vdilation : int
+            The vertical dilation.
+        hdilation : int
+            The horizontal dilation.
+
+        Returns
+        -------
+        array_like
+            The dx matrix.
+        """
 
         ck, kh, kw, kn = weights.shape
         b2, ho, wo, kn2 = dy.shape
@@ -318,17 +391,34 @@ class ConvGemm:
         assert b == b2, "Different batch size!"
         assert ck == c, "Number of channels in weights and x should be the same!"
 
-        self.x_deconv_gemm_nhwc(ctypes.c_uint(b), ctypes.c_uint(h), ctypes.c_uint(w), ctypes.c_uint(c),
-                        ctypes.c_uint(kn), ctypes.c_uint(kh), ctypes.c_uint(kw),
-                        ctypes.c_uint(vstride), ctypes.c_uint(hstride),
-                        ctypes.c_uint(vpadding), ctypes.c_uint(hpadding),
-                        ctypes.c_uint(vdilation), ctypes.c_uint(hdilation),
-                        ctypes.c_void_p(weights.ctypes.data),
-                        ctypes.c_void_p(dy.ctypes.data), ctypes.c_void_p(dx.ctypes.data),
-                        self.ac_pack, self.bc_pack)
+        # libconvGemm expects C-contiguous matrices (already contiguous matrices are not copied)
+        weights, dy = np.ascontiguousarray(weights), np.ascontiguousarray(dy)
+
+        self.x_deconv_gemm_nhwc(b, h, w, c, kn, kh, kw,
+                                vstride, hstride, vpadding, hpadding, vdilation, hdilation,
+                                weights.ctypes.data, dy.ctypes.data, dx.ctypes.data,
+                                self.ac_pack, self.bc_pack)
 
         return dx
 
+
+def _set_prototypes(lib):
+    """
+    Declares the prototypes of the libconvGemm functions, so that plain
+    Python integers, booleans and addresses can be passed to them and converted
+    by ctypes, instead of wrapping each argument on every call.
+    """
+    c_float_p = ctypes.POINTER(ctypes.c_float)
+    lib.alloc_pack_buffs.restype = ctypes.c_int
+    conv_gemm_argtypes = [ctypes.c_char] + [ctypes.c_uint] * 13 + [ctypes.c_void_p] * 8 + [ctypes.c_bool] + \
+                         [c_float_p, c_float_p]
+    deconv_gemm_argtypes = [ctypes.c_uint] * 13 + [ctypes.c_void_p] * 3 + [c_float_p, c_float_p]
+    for name in ("sconvGemmNCHW", "sconvGemmNHWC"):
+        getattr(lib, name).argtypes = conv_gemm_argtypes
+    for name in ("sconvGemmNCHW_back", "sconvGemmNHWC_back"):
+        getattr(lib, name).argtypes = deconv_gemm_argtypes
+
+
 def __free__(pack):
     def find_msvcr():
         import re
@@ -337,16 +427,18 @@ def __free__(pack):
         match = re.search("msvcr([0-9]+|t).dll", str(exec_bytes), re.IGNORECASE)
         return match.group(0)
 
-    if platform.system() == 'Windows':
-        libc = ctypes.cdll.LoadLibrary(find_msvcr())
-    elif platform.system() == 'Linux':
-        libc = ctypes.cdll.LoadLibrary('libc.so.6')
-    elif platform.system == 'Darwin':
-        libc = ctypes.cdll.LoadLibrary('libc.dylib')
-    else:
-        raise AssertionError("Don't know how to get to libc for a '{}' system".format(platform.system()))
+    if not hasattr(__free__, "libc"):
+        system = platform.system()
+        if system == 'Windows':
+            __free__.libc = ctypes.cdll.LoadLibrary(find_msvcr())
+        elif system == 'Linux':
+            __free__.libc = ctypes.cdll.LoadLibrary('libc.so.6')
+        elif system == 'Darwin':
+            __free__.libc = ctypes.cdll.LoadLibrary('libc.dylib')
+        else:
+            raise AssertionError("Don't know how to get to libc for a '{}' system".format(system))
     assert isinstance(pack, object)
-    libc.free(pack)
+    __free__.libc.free(pack)
 
 
 def __usage_example__():
@@ -24,6 +24,7 @@ PyDTNN convWinograd module
 import ctypes
 import math
 import platform
+import sys
 import weakref
 from collections import defaultdict
 
@@ -32,7 +33,7 @@ import numpy as np
 from pydtnn.utils import PYDTNN_TENSOR_FORMAT_NCHW, PYDTNN_TENSOR_FORMAT_NHWC
 from pydtnn.utils import load_library
 from pydtnn.utils.best_of import BestOf
-from pydtnn.utils.memory_cache import MemoryCache
+from pydtnn.utils.memory_cache import MemoryArena, MemoryCache
 
 try:
     load_library("convwinograd")
@@ -40,6 +41,11 @@ try:
 except ImportError:
     is_conv_winograd_available = False
 
+# Prototype shared by all the libconvWinograd routines, so that plain Python integers, bytes and addresses can be
+# passed to them and converted by ctypes, instead of wrapping each argument on every call
+_conv_winograd_argtypes = [ctypes.c_uint] * 11 + ([ctypes.c_void_p] + [ctypes.c_uint] * 3) * 3 + \
+                          [ctypes.c_void_p] * 7 + [ctypes.c_char] * 2 + [ctypes.c_void_p] * 4
+
 
 class ConvWinograd:
     """
@@ -66,6 +72,7 @@ class ConvWinograd:
     """
 
     lib_cw = None  # will link to the libconvwinograd.so library
+    _workspaces = {}  # scratch buffers shared by all the instances (one per data type)
 
     def __init__(self, kh, kw, vstride, hstride, vdilation, hdilation,
                  dtype=np.float32, tensor_format=PYDTNN_TENSOR_FORMAT_NCHW,
@@ -114,13 +121,18 @@ class ConvWinograd:
                 raise NotImplementedError(f"Platform '{str(platform.machine())}' not yet supported")
 
             try:
-                funcs = (self._conv_winograd_c, getattr(self.__class__.lib_cw, routine_name))
+                routine = getattr(self.__class__.lib_cw, routine_name)
+                routine.argtypes = _conv_winograd_argtypes
+                # The transform matrices never change, so the C version receives their addresses, which are only
+                # obtained once (the matrices are kept alive by self.transform_matrices)
+                self.transform_matrices.append((g, bt, at))
+                funcs, matrices = (self._conv_winograd_c, routine), (g.ctypes.data, bt.ctypes.data, at.ctypes.data)
             except AttributeError:
                 print(f"Winograd {routine_name} routine not found. Fallback to numpy version!")
-                funcs = (self._conv_winograd_numpy, None)
+                funcs, matrices = (self._conv_winograd_numpy, None), (g, bt, at)
 
             self.alternatives[r].append((f"winograd_{m}x{m}_{r}x{r}",
-                                         lambda *args, **kwargs: funcs[0](m, r, g, bt, at, funcs[1], *args, **kwargs)))
+                                         lambda *args, **kwargs: funcs[0](m, r, *matrices, funcs[1], *args, **kwargs)))
 
         # Parent layer
         if parent_layer is not None:
@@ -144,6 +156,7 @@ class ConvWinograd:
             ConvWinograd.lib_cw = load_library("convwinograd")
 
         self.alternatives = defaultdict(lambda: [])
+        self.transform_matrices = []
         m, r = None, None
 
         if (kh, kw) == (2, 2) and (vstride, hstride) == (1, 1) and (vdilation, hdilation) == (1, 1):
@@ -232,13 +245,22 @@ class ConvWinograd:
         if r not in self.alternatives:
             raise NotImplementedError(f"Winograd not implemented for kernel {kh}x{kw}")
 
-        # The x_padded and output matrices are also cached, but only on the current instance
-        # self.x_padded_cache = MemoryCache(lambda shape: np.zeros(shape, self.dtype, order="C"))
+        # The x_padded and output matrices are also cached, but only on the current instance. The x_padded cache is
+        # indexed by (shape, borders), as its zeroed borders depend on the input size and padding, not only on its
+        # shape.
+        self.x_padded_cache = MemoryCache(lambda key: np.zeros(key[0], self.dtype, order="C"))
         self.y_cache = MemoryCache(lambda shape: np.zeros(shape, self.dtype, order="C"))
+        # As y, u is also given to the C kernel, which can not be verified to fully overwrite it, so it is zeroed
+        # too (only once per shape, while the memory cache is enabled)
         self.u_cache = MemoryCache(lambda shape: np.zeros(shape, self.dtype, order="C"))
-        self.v_cache = MemoryCache(lambda shape: np.zeros(shape, self.dtype, order="C"))
-        self.m_cache = MemoryCache(lambda shape: np.zeros(shape, self.dtype, order="C"))
-        self.d_cache = MemoryCache(lambda shape: np.zeros(shape, self.dtype, order="C"))
+        # Weights used to compute the cached u (initialized to NaN, so they never match on the first call)
+        self.u_weights_cache = MemoryCache(lambda shape: np.full(shape, np.nan, self.dtype, order="C"))
+        # The v, m and z scratch matrices are fully overwritten on each call and not used after it, so they are
+        # carved from a single buffer that is sized for the largest call. As the layers are executed one after
+        # the other, this buffer is shared by all the instances with the same data type.
+        if self.dtype not in ConvWinograd._workspaces:
+            ConvWinograd._workspaces[self.dtype] = MemoryArena(self.dtype)
+        self.workspace = ConvWinograd._workspaces[self.dtype]
 
         # Debug
         self.debug = debug
@@ -285,115 +307,93 @@ class ConvWinograd:
         tile_h = math.ceil((hi + 2 * vpadding - t) / s) + 1
         tile_w = math.ceil((wi + 2 * hpadding - t) / s) + 1
 
+        # The transformed input (v), product (m) and output (z) matrices are laid out as
+        # (t, t, ci|co, n, tile_h, tile_w) on NCHW and as (t, t, n, tile_h, tile_w, ci|co) on NHWC, so that their
+        # innermost dimension matches the contiguous one of x and y
         if self.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW:
             y = self.y_cache[(n, co, ho, wo)]  # Output
+            u_dims, v_dims, m_dims = (co, ci), (ci, n, tile_h, tile_w), (co, n, tile_h, tile_w)
         else:
             y = self.y_cache[(n, ho, wo, co)]  # Output
-        u = self.u_cache[(t, t, co, ci)]  # Workspace for G * g * G^T
-        v = self.v_cache[(t, t, ci, (n * tile_h * tile_w))]
-        # m_= self.m_cache[(t, t, co, (n * tile_h * tile_w))]
-        d = self.d_cache[(t, t)]
-
-        for k in range(co):
-            for c in range(ci):
-                # U = G  * g * G^T
-                u[..., k, c] = (g @ weights[k, c, ...]) @ g.T
-
-        # 1.1) First alternative: padding first
-        # x_padded = best_pad(x, vpadding, hpadding)
-        # _, _, hi, wi = x_padded.shape
-        #
-        # for c in range(ci):
-        #     for b in range(n):
-        #         for h in range(tile_h):
-        #             for w in range(tile_w):
-        #                 hh, ww = h * s, w * s
-        #                 th, tw = min(hi-hh,t), min(wi-ww,t)
-        #                 d[:th, :tw] = x_padded[b, c, hh:hh+th, ww:ww+tw]
-        #                 v[..., c, b * tile_h * tile_w + h * tile_w + w] = (self.bt @ d) @ self.bt.T
-
-        # 1.2) Second alternative: avoid padding
-        for c in range(ci):
-            for b in range(n):
-                for h in range(tile_h):
-                    hh_ = min(hi, h * s - vpadding)
-                    hh, fh = (hh_, 0) if hh_ > 0 else (0, min(-hh_, t))
-                    oh = max(min(t, hi - hh) - min(t, fh), 0)
-
-                    for w in range(tile_w):
-                        ww_ = min(wi, w * s - hpadding)
-                        ww, fw = (ww_, 0) if ww_ > 0 else (0, min(-ww_, t))
-                        ow = max(min(t, wi - ww) - min(t, fw), 0)
-
-                        if hh < hh + oh and ww < ww + ow:
-                            if self.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW:
-                                d[fh:fh + oh, fw:fw + ow] = x[b, c, hh:hh + oh, ww:ww + ow]
-                            else:
-                                d[fh:fh + oh, fw:fw + ow] = x[b, hh:hh + oh, ww:ww + ow, c]
-
-                        #   0  0  0
-                        #   X  X  X
-                        #   X  X  X
-                        if 0 <= fh:
-                            d[:fh, ...] = 0
-
-                        #   0  0  0
-                        #   X  X  X
-                        #   0  0  0
-                        if fh + oh < t:
-                            d[fh + oh:, ...] = 0
-
-                        #   0  0  0
-                        #   0  X  X
-                        #   0  0  0
-                        if 0 <= fw:
-                            d[fh:fh + oh, :fw] = 0
-
-                        #   0  0  0
-                        #   0  X  0
-                        #   0  0  0
-                        if fw + ow < t:
-                            d[fh:fh + oh, fw + ow:] = 0
-
-                        v[..., c, b * tile_h * tile_w + h * tile_w + w] = (bt @ d) @ bt.T
-
-        # 2.1) First alternative: np.einsum
-        m_ = np.einsum('... i j, ... j k -> ... i k', u, v)
-
-        # 2.2) Second alternative: matmul
-        # for i in range(t):
-        #     for j in range(t):
-        #         m_[i, j] = u[i, j] @ v[i, j]
-
-        for k in range(co):
-            for b in range(n):
-                for h in range(tile_h):
-                    for w in range(tile_w):
-                        z = (at @ m_[..., k, b * tile_h * tile_w + h * tile_w + w]) @ at.T
-                        hh, ww = h * s, w * s
-                        if self.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW:
-                            y[b, k, hh:hh + m, ww:ww + m] = z[:min(m, ho - hh), :min(m, wo - ww)]
-                        else:
-                            y[b, hh:hh + m, ww:ww + m, k] = z[:min(m, ho - hh), :min(m, wo - ww)]
-
-            if biases is not None:
-                if self.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW:
-                    y[:, k, ...] += biases[k]
-                else:
-                    y[..., k] += biases[k]
+            u_dims, v_dims, m_dims = (ci, co), (n, tile_h, tile_w, ci), (n, tile_h, tile_w, co)
+        if (m, r) == (2, 3):
+            v, m_, z = self.workspace((t, t, *v_dims), (t, t, *m_dims), (m, m, *m_dims))
+        else:
+            # z is obtained from np.tensordot() in step 3, so no workspace is carved for it
+            v, m_ = self.workspace((t, t, *v_dims), (t, t, *m_dims))
+
+        # 0) U = G * g * G^T is only computed again when the weights have changed since the previous call. As the
+        #    optimizers update the weights in place, they are compared against a copy of the ones used last time.
+        #    It is laid out as (t, t, co, ci) on NCHW and as (t, t, ci, co) on NHWC.
+        u = self.u_cache[(t, t, *u_dims)]  # Workspace for G * g * G^T
+        u_weights = self.u_weights_cache[(t, *weights.shape)]
+        if not np.array_equal(u_weights, weights):
+            u_weights[...] = weights
+            if self.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW:
+                g_w = np.tensordot(g, weights, axes=([1], [2]))  # (t, co, ci, r)
+            else:
+                g_w = np.tensordot(g, weights, axes=([1], [1]))  # (t, ci, r, co)
+                g_w = g_w.transpose(0, 1, 3, 2)
+            u[...] = np.tensordot(g_w, g, axes=([3], [1])).transpose(0, 3, 1, 2)
+
+        # 1) Padding first: the padded buffer also covers the overhang of the last tiles. Its borders are zeroed
+        #    when it is created and never written afterwards, so only the interior is copied. As two inputs with
+        #    different sizes and paddings can lead to the same padded shape, the input size and padding are also
+        #    part of the cache key. Then, the tiles are taken as a strided view of it with the same layout as v.
+        borders = (hi, wi, vpadding, hpadding)
+        if self.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW:
+            x_padded = self.x_padded_cache[((n, ci, (tile_h - 1) * s + t, (tile_w - 1) * s + t), borders)]
+            x_padded[:, :, vpadding:vpadding + hi, hpadding:hpadding + wi] = x
+            st_n, st_c, st_h, st_w = x_padded.strides
+            d_strides = (st_c, st_n, s * st_h, s * st_w)
+        else:
+            x_padded = self.x_padded_cache[((n, (tile_h - 1) * s + t, (tile_w - 1) * s + t, ci), borders)]
+            x_padded[:, vpadding:vpadding + hi, hpadding:hpadding + wi, :] = x
+            st_n, st_h, st_w, st_c = x_padded.strides
+            d_strides = (st_n, s * st_h, s * st_w, st_c)
+        d = np.lib.stride_tricks.as_strided(x_padded, shape=(t, t, *v_dims), strides=(st_h, st_w, *d_strides),
+                                            writeable=False)
+
+        # V = B^T * d * B for all the tiles at once
+        if (m, r) == (2, 3):
+            _winograd_2x2_3x3_input_transform(d, v)
+        else:
+            v[...] = np.tensordot(np.tensordot(bt, d, axes=([1], [0])), bt, axes=([1], [1])).transpose(0, 5, 1, 2, 3, 4)
 
-            if bn:
-                if self.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW:
-                    y[:, k, ...] = (((y[:, k, ...] - running_mean[k]) * inv_std[k]) * gamma[k]) + beta[k]
-                else:
-                    y[..., k] = (((y[..., k] - running_mean[k]) * inv_std[k]) * gamma[k]) + beta[k]
+        # 2) M = U * V, as a batch of t x t matrix products (np.matmul dispatches each of them to BLAS, while
+        #    np.einsum('... i j, ... j k -> ... i k', u, v) does not)
+        if self.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW:
+            np.matmul(u, v.reshape(t, t, ci, -1), out=m_.reshape(t, t, co, -1))
+        else:
+            np.matmul(v.reshape(t, t, -1, ci), u, out=m_.reshape(t, t, -1, co))
+
+        # 3) Z = A^T * M * A for all the tiles at once. As tile_h * m >= ho and tile_w * m >= wo, the tiles are
+        #    laid out side by side and the overhang of the last ones is cropped.
+        if (m, r) == (2, 3):
+            _winograd_2x2_3x3_output_transform(m_, z)
+        else:
+            z = np.tensordot(np.tensordot(at, m_, axes=([1], [0])), at, axes=([1], [1])).transpose(0, 5, 1, 2, 3, 4)
+        if self.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW:
+            y[...] = z.transpose(3, 2, 4, 0, 5, 1).reshape(n, co, tile_h * m, tile_w * m)[:, :, :ho, :wo]
+        else:
+            y[...] = z.transpose(2, 3, 0, 4, 1, 5).reshape(n, tile_h * m, tile_w * m, co)[:, :ho, :wo, :]
+
+        # 4) Biases, batch normalization and relu are applied in place with per-channel vectors
+        channels = (1, co, 1, 1) if self.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW else (co,)
+        if biases is not None:
+            y += biases.reshape(channels)
+
+        if bn:
+            y -= running_mean.reshape(channels)
+            y *= (inv_std * gamma).reshape(channels)
+            y += beta.reshape(channels)
 
         if relu:
-            y[y < 0] = 0
+            np.maximum(y, 0, out=y)
 
         return y
 
-    def _conv_winograd_c(self, m, r, g, bt, at, x_winograd,
+    def _conv_winograd_c(self, m, r, g_ptr, bt_ptr, at_ptr, x_winograd,
                          weights, x, biases=None, vpadding=0, hpadding=0,
                          vstride=1, hstride=1, vdilation=1, hdilation=1,
                          relu=False, bn=False, running_mean=None, inv_std=None,
@@ -428,8 +428,11 @@ class ConvWinograd:
         tile_w = math.ceil((wi + 2 * hpadding - t) / s) + 1
 
         u = self.u_cache[(t, t, co, ci)]  # Workspace for G * g * G^T
-        v = self.v_cache[(t, t, ci, (n * tile_h * tile_w))]
-        m1 = self.m_cache[(t, t, co, (n * tile_h * tile_w))]
+        v, m1 = self.workspace((t, t, ci, n * tile_h * tile_w), (t, t, co, n * tile_h * tile_w))
+        # Unlike the numpy version, it can not be verified that the C kernel fully overwrites v and m1 before
+        # reading them, so the workspace contents (left by the previous call) are zeroed as the former buffers were
+        v[...] = 0
+        m1[...] = 0
 
         if self.tensor_format == PYDTNN_TENSOR_FORMAT_NCHW:
             y = self.y_cache[(n, co, ho, wo)]  # Output
@@ -442,26 +445,45 @@ class ConvWinograd:
             ld_f1, ld_f2, ld_f3 = kh * kw * co, kw * co, co
             ld_y1, ld_y2, ld_y3 = ho * wo * co, wo * co, co
 
-        x_winograd(ctypes.c_uint(m), ctypes.c_uint(r),
-                   ctypes.c_uint(n), ctypes.c_uint(co), ctypes.c_uint(ci),
-                   ctypes.c_uint(hi), ctypes.c_uint(wi),
-                   ctypes.c_uint(kh), ctypes.c_uint(kw),
-                   ctypes.c_uint(vpadding), ctypes.c_uint(hpadding),
-                   ctypes.c_void_p(x.ctypes.data), ctypes.c_uint(ld_d1), ctypes.c_uint(ld_d2), ctypes.c_uint(ld_d3),
-                   ctypes.c_void_p(weights.ctypes.data),
-                   ctypes.c_uint(ld_f1), ctypes.c_uint(ld_f2), ctypes.c_uint(ld_f3),
-                   ctypes.c_void_p(y.ctypes.data), ctypes.c_uint(ld_y1), ctypes.c_uint(ld_y2), ctypes.c_uint(ld_y3),
-                   ctypes.c_void_p(None if biases is None else biases.ctypes.data),
-                   ctypes.c_void_p(bt.ctypes.data), ctypes.c_void_p(g.ctypes.data), ctypes.c_void_p(at.ctypes.data),
-                   ctypes.c_void_p(u.ctypes.data), ctypes.c_void_p(v.ctypes.data), ctypes.c_void_p(m1.ctypes.data),
-                   ctypes.c_char((b'F', b'T')[relu]), ctypes.c_char((b'F', b'T')[bn]),
-                   ctypes.c_void_p(None if running_mean is None else running_mean.ctypes.data),
-                   ctypes.c_void_p(None if inv_std is None else inv_std.ctypes.data),
-                   ctypes.c_void_p(None if gamma is None else gamma.ctypes.data),
-                   ctypes.c_void_p(None if beta is None else beta.ctypes.data))
+        x_winograd(m, r, n, co, ci, hi, wi, kh, kw, vpadding, hpadding,
+                   x.ctypes.data, ld_d1, ld_d2, ld_d3,
+                   weights.ctypes.data, ld_f1, ld_f2, ld_f3,
+                   y.ctypes.data, ld_y1, ld_y2, ld_y3,
+                   None if biases is None else biases.ctypes.data,
+                   bt_ptr, g_ptr, at_ptr,
+                   u.ctypes.data, v.ctypes.data, m1.ctypes.data,
+                   (b'F', b'T')[relu], (b'F', b'T')[bn],
+                   None if running_mean is None else running_mean.ctypes.data,
+                   None if inv_std is None else inv_std.ctypes.data,
+                   None if gamma is None else gamma.ctypes.data,
+                   None if beta is None else beta.ctypes.data)
         return y
 
 
+def _winograd_2x2_3x3_input_transform(d, v):
+    """
+    Computes v = B^T * d * B for F(2x2, 3x3) using the closed form of B^T,
+    which only requires additions and subtractions. The first two axes of d
+    and v are the tile rows and columns, the remaining ones are batched.
+    """
+    for i, row in enumerate((d[0] - d[2], d[1] + d[2], d[2] - d[1], d[1] - d[3])):
+        np.subtract(row[0], row[2], out=v[i, 0])
+        np.add(row[1], row[2], out=v[i, 1])
+        np.subtract(row[2], row[1], out=v[i, 2])
+        np.subtract(row[1], row[3], out=v[i, 3])
+
+
+def _winograd_2x2_3x3_output_transform(m, z):
+    """
+    Computes z = A^T * m * A for F(2x2, 3x3) using the closed form of A^T,
+    which only requires additions and subtractions. The first two axes of m
+    and z are the tile rows and columns, the remaining ones are batched.
+    """
+    for i, row in enumerate((m[0] + m[1] + m[2], m[1] - m[2] - m[3])):
+        np.add(row[0] + row[1], row[2], out=z[i, 0])
+        np.subtract(row[1] - row[2], row[3], out=z[i, 1])
+
+
 def __usage_example__():
     # Imports for this usage example (not required otherwise)
     from timeit import timeit
@@ -555,22 +577,36 @@ def __usage_example__():
     print("Sum WINOGRAD NHWC: ", conv_winograd_result_nhwc.sum(), conv_winograd_result_nhwc.shape)
     print("Sum   IM2COL NHWC: ", im2col_mm_result_nhwc.sum(), im2col_mm_result_nhwc.shape)
     print("np.allclose NHWC: ", np.allclose(conv_winograd_result_nhwc, im2col_mm_result_nhwc, atol=1e-3))
-    # """
 
+
+def __sweep_example__():
+    """
+    Compares conv_winograd against im2col+mm on a grid of problem sizes.
+    This example can be run with: 'python conv_winograd.py --sweep'
+    """
+    # Imports for this example (not required otherwise)
+    from timeit import timeit
+    from pydtnn.cython_modules import im2col_nchw_cython, im2row_nhwc_cython
+    vstride = hstride = 1
+    vdilation = hdilation = 1
     # n = 65
     # c = k = 65
     # h = w = 33
     # vpadd = hpadd = 6
     n = 17
     c = k = 17
-    h = w = 33
+    h = 33
     vpadd = hpadd = 6
+    # The instances are created only once, so that their caches are kept among the different problem sizes
+    conv_winograds = {(kh, tensor_fmt): ConvWinograd(kh, kh, vstride, hstride, vdilation, hdilation,
+                                                     tensor_format=tensor_fmt, debug=False)
+                      for kh in [2, 3, 5] for tensor_fmt in [PYDTNN_TENSOR_FORMAT_NCHW, PYDTNN_TENSOR_FORMAT_NHWC]}
     for nn in range(16, n, 16):
         for cc in range(16, c, 16):
             for kk in range(16, k, 16):
                 for hh in range(8, h, 4):
-                    for vpadding in range(1, vpadd):
-                        for hpadding in range(1, hpadd):
+                    for vpadding in range(1, vpadd, 2):
+                        for hpadding in range(1, hpadd, 2):
                             for kh in [2, 3, 5]:
                                 kw = kh
                                 ww = hh
@@ -578,8 +614,7 @@ def __usage_example__():
                                 wo = (ww + 2 * hpadding - hdilation * (kw - 1) - 1) // hstride + 1
 
                                 for tensor_fmt in [PYDTNN_TENSOR_FORMAT_NCHW, PYDTNN_TENSOR_FORMAT_NHWC]:
-                                    conv_winograd = ConvWinograd(kh, kw, vstride, hstride, vdilation, hdilation,
-                                                                 tensor_format=tensor_fmt, debug=False)
+                                    conv_winograd = conv_winograds[(kh, tensor_fmt)]
                                     print(nn, cc, kk, hh, ww, vpadding, hpadding, kh, conv_winograd.tensor_format_str,
                                           end="")
 
@@ -654,8 +689,9 @@ def __usage_example__():
                                     # print(" np.sum:", np.max(np.abs(conv_winograd_result-im2col_mm_result)), end="")
                                     print((" WINOGR", " IM2COL")[conv_winograd_t > im2col_t],
                                           im2col_t / conv_winograd_t)
-    # """
 
 
 if __name__ == "__main__":
     __usage_example__()
+    if "--sweep" in sys.argv:
+        __sweep_example__()
@@ -134,6 +134,7 @@ _cg_group.add_argument('--enable_memory_cache', type=bool_lambda, default=True)
 # ConvWinograd
 _wg_group = parser.add_argument_group("ConvWinograd options")
 _wg_group.add_argument('--enable_conv_winograd', type=bool_lambda, default=False)
+_wg_group.add_argument('--conv_winograd_min_channels', type=int, default=16)
 
 # Parallel execution options
 _pe_group = parser.add_argument_group("Parallel execution options")
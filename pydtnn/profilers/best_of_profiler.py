@@ -41,7 +41,9 @@ class BestOfProfiler:
         print(f"{problem_size}: First run (checking outputs)", sep="", end="")
         outputs = []
         for i in range(self.best_method.total_alternatives):
-            outputs.append(self.best_method(*args, **kwargs))
+            output = self.best_method(*args, **kwargs)
+            # The alternatives may write on an output buffer provided in args, so a copy of each output is kept
+            outputs.append(output.copy() if type(output) == np.ndarray else output)
             print(".", sep="", end="")
             if i > 0:
                 if type(outputs[0]) == np.ndarray:
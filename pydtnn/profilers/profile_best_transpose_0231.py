@@ -18,7 +18,9 @@ def main():
     for layer in layers:
         d0, d1, d2, d3 = layer.shape
         original = np.random.rand(d0, d1, d2, d3).astype(layer.dtype, order="C")
-        bop(original)
+        # The output is also allocated only once, so that the timings do not include its allocation
+        transposed = np.empty((d0, d2, d3, d1), layer.dtype, order="C")
+        bop(original, transposed)
     bop.print_results()
 
 
@@ -0,0 +1,206 @@
+"""
+Unitary tests for best_of.py.
+
+For running all the tests quietly, execute the next command:
+    python -um unittest pydtnn.tests.BestOfTestCase
+
+For running all the tests verbosely, execute the next command:
+    python -um unittest -v pydtnn.tests.BestOfTestCase
+
+For running an individual test verbosely, execute the next command:
+    python -um unittest -v pydtnn.tests.BestOfTestCase.test_name
+"""
+
+import contextlib
+import io
+import time
+import unittest
+from unittest import mock
+
+from pydtnn.utils.best_of import BestOf
+
+
+def _spin(seconds):
+    """Busy waits the given seconds (time.sleep() is not accurate enough for short times)"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _call_until_best_is_found(best_of, x, max_calls=1000):
+    """Calls best_of(x) until its best alternative for x is found, returns the number of calls"""
+    for n in range(1, max_calls + 1):
+        best_of(x)
+        if best_of.best_method_has_been_found(x):
+            return n
+    raise AssertionError(f"The best alternative of '{best_of.name}' has not been found after {max_calls} calls")
+
+
+class _FakeTimer:
+    """Fake clock that only advances when an alternative calls its spend() method"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def spend(self, seconds):
+        self.now += seconds
+
+
+class BestOfTestCase(unittest.TestCase):
+    """
+    Tests that BestOf selects the fastest alternative
+    """
+
+    def test_fastest_alternative_is_selected(self):
+        """Tests that the fastest alternative is selected for each problem size and then the only one called"""
+        calls = {"slow": 0, "fast": 0, "mid": 0}
+
+        def alternative(name, seconds_per_unit):
+            def f(x):
+                calls[name] += 1
+                _spin(seconds_per_unit * x)
+                return name, x
+            return f
+
+        best_of = BestOf("fastest", [(name, alternative(name, t)) for name, t in
+                                     (("slow", 4e-4), ("fast", 2e-5), ("mid", 1e-4))],
+                         get_problem_size=lambda x: x)
+        for x in (1, 2, 3):
+            self.assertFalse(best_of.best_method_has_been_found(x))
+            _call_until_best_is_found(best_of, x)
+            self.assertEqual(best_of.best_name[x], "fast")
+            self.assertEqual(best_of.best_idx[x], 1)
+        calls_before = dict(calls)
+        for x in (1, 2, 3):
+            self.assertEqual(best_of(x), ("fast", x))
+        self.assertEqual(calls["fast"], calls_before["fast"] + 3)
+        self.assertEqual((calls["slow"], calls["mid"]), (calls_before["slow"], calls_before["mid"]))
+        self.assertEqual(set(best_of.speedups()), {1, 2, 3})
+        self.assertTrue(all(speedup > 1 for speedup in best_of.speedups().values()))
+
+    def test_fastest_pipeline_is_selected(self):
+        """Tests that the fastest pipeline is selected when its stages are called in order"""
+
+        def stage(i, seconds):
+            def f(x):
+                _spin(seconds)
+                return i, x
+            return f
+
+        best_of = BestOf("fastest_pipeline", [("slow", [stage(0, 2e-4), stage(1, 2e-4)]),
+                                              ("fast", [stage(0, 1e-5), stage(1, 1e-5)])],
+                         get_problem_size=lambda x: x)
+        for _ in range(1000):
+            if best_of.best_method_has_been_found(7):
+                break
+            self.assertEqual(best_of(0, 7), (0, 7))
+            self.assertEqual(best_of(1, 7), (1, 7))
+        self.assertEqual(best_of.best_name[7], "fast")
+        self.assertIs(best_of.best_pipeline[7], best_of.alternatives[1][1])
+        self.assertEqual(best_of(1, 7), (1, 7))
+
+    def test_use_always_the_first_alternative(self):
+        """Tests that the first alternative is directly called when the competition is disabled"""
+        first_pipeline = [lambda x: ("first", 0, x), lambda x: ("first", 1, x)]
+        second_pipeline = [lambda x: ("second", 0, x), lambda x: ("second", 1, x)]
+        try:
+            early = BestOf("first_early", [("first", lambda x: ("first", x)), ("second", lambda x: ("second", x))],
+                           get_problem_size=lambda x: x)
+            BestOf.use_always_the_first_alternative()
+            late = BestOf("first_late", [("first", lambda x: ("first", x)), ("second", lambda x: ("second", x))],
+                          get_problem_size=lambda x: x)
+            pipeline = BestOf("first_pipeline", [("first", first_pipeline), ("second", second_pipeline)],
+                              get_problem_size=lambda x: x)
+            for best_of in (early, late):
+                self.assertIs(best_of._dispatch, best_of.alternatives[0][1])
+                for _ in range(50):
+                    self.assertEqual(best_of(3), ("first", 3))
+                self.assertFalse(best_of.best_method_has_been_found(3))
+            for _ in range(50):
+                self.assertEqual(pipeline(0, 3), ("first", 0, 3))
+                self.assertEqual(pipeline(1, 3), ("first", 1, 3))
+            self.assertFalse(pipeline.best_method_has_been_found(3))
+        finally:
+            BestOf._use_first_alternative = False
+            for best_of in list(BestOf._instances):
+                best_of._set_instance_call()
+
+    def test_nested_report(self):
+        """Tests that the report of nested BestOf instances shows the inner executions under the outer ones"""
+        inner = BestOf("report_inner", [("slow", lambda x: _spin(2e-4)), ("fast", lambda x: _spin(1e-5))],
+                       get_problem_size=lambda x: x)
+
+        def outer_a(x):
+            inner(x)
+            _spin(2e-4)
+
+        def outer_b(x):
+            inner(x)
+
+        outer = BestOf("report_outer", [("a", outer_a), ("b", outer_b)], get_problem_size=lambda x: x)
+        _call_until_best_is_found(outer, 5)
+        self.assertEqual(inner.best_name[5], "fast")
+        self.assertEqual(outer.best_name[5], "b")
+        inner_executions = list(inner._executions.values())
+        outer_executions = list(outer._executions.values())
+        self.assertEqual(len(outer_executions), 1)
+        self.assertTrue(inner_executions)
+        self.assertTrue(all(execution.parent is outer_executions[0] for execution in inner_executions))
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            BestOf.print_report()
+        report = output.getvalue()
+        self.assertIn("BestOf execution graph", report)
+        for execution in outer_executions + inner_executions:
+            self.assertIn(execution.name, report)
+        self.assertLess(report.index(outer_executions[0].name), report.index(inner_executions[0].name))
+
+    def test_slow_alternative_is_pruned_early(self):
+        """Tests that a much slower alternative is pruned before prune_after_round calls"""
+        fake_timer = _FakeTimer()
+        calls = {"slow": 0, "fast": 0, "mid": 0}
+
+        def alternative(name, seconds):
+            def f(x):
+                calls[name] += 1
+                fake_timer.spend(seconds)
+                return x
+            return f
+
+        with mock.patch("pydtnn.utils.best_of.timer", fake_timer):
+            best_of = BestOf("pruned_early", [(name, alternative(name, t)) for name, t in
+                                              (("slow", 3e-3), ("fast", 1e-4), ("mid", 2e-4))],
+                             get_problem_size=lambda x: x, prune_after_round=4)
+            _call_until_best_is_found(best_of, 1)
+        self.assertEqual(best_of.best_name[1], "fast")
+        self.assertLess(calls["slow"], best_of.prune_after_round)
+        self.assertGreaterEqual(calls["mid"], best_of.prune_after_round)
+
+    def test_cold_start_alternative_is_not_pruned(self):
+        """Tests that an alternative whose first call is much slower than the next ones is not pruned early"""
+        fake_timer = _FakeTimer()
+        calls = {"cold": 0, "steady": 0}
+
+        def cold(x):
+            fake_timer.spend(50e-3 if calls["cold"] == 0 else 1e-4)
+            calls["cold"] += 1
+            return x
+
+        def steady(x):
+            fake_timer.spend(1e-3)
+            calls["steady"] += 1
+            return x
+
+        with mock.patch("pydtnn.utils.best_of.timer", fake_timer):
+            best_of = BestOf("cold_start_early", [("steady", steady), ("cold", cold)],
+                             get_problem_size=lambda x: x, pruning_speedup=20, prune_after_round=4)
+            _call_until_best_is_found(best_of, 1)
+        self.assertEqual(best_of.best_name[1], "cold")
+        self.assertGreaterEqual(calls["cold"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Unitary tests for Conv2DCPU using ConvWinograd.
+
+For running all the tests quietly, execute the next command:
+    python -um unittest pydtnn.tests.Conv2DConvWinogradTestCase
+
+For running all the tests verbosely, execute the next command:
+    python -um unittest -v pydtnn.tests.Conv2DConvWinogradTestCase
+
+For running an individual test verbosely, execute the next command:
+    python -um unittest -v pydtnn.tests.Conv2DConvWinogradTestCase.test_name
+"""
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from pydtnn.backends.cpu.layers.conv_2d_cpu import Conv2DCPU
+from pydtnn.backends.cpu.libs import ConvWinograd
+from ..model import Model, TRAIN_MODE
+
+
+class Params:
+    pass
+
+
+def get_conv2d_cpu_layer(ci, co, conv_winograd_min_channels, h=8, w=8):
+    params = Params()
+    params.batch_size = 2
+    params.enable_conv_gemm = False
+    params.enable_conv_winograd = True
+    params.conv_winograd_min_channels = conv_winograd_min_channels
+    params.enable_best_of = False
+    params.tensor_format = 'NCHW'
+    # The numpy version of ConvWinograd is used, so that the test does not depend on libconvWinograd
+    with mock.patch.object(ConvWinograd, "lib_cw", object()), contextlib.redirect_stdout(io.StringIO()):
+        model = Model(**vars(params))
+        model.mode = TRAIN_MODE
+        conv2d = Conv2DCPU(nfilters=co, filter_shape=(3, 3), padding=(1, 1), stride=(1, 1), dilation=(1, 1),
+                           use_bias=True, weights_initializer="glorot_uniform", biases_initializer="zeros")
+        conv2d.set_model(model)
+        conv2d.initialize(prev_shape=(ci, h, w))
+    return conv2d
+
+
+class Conv2DConvWinogradTestCase(unittest.TestCase):
+    """
+    Tests that Conv2D only uses Winograd on the layers with enough channels
+    """
+
+    def test_min_channels(self):
+        """Tests that Winograd is only used if min(ci, co) >= conv_winograd_min_channels"""
+        for ci, co, min_channels, expected in ((4, 4, 16, "_forward_nchw_i2c"),
+                                               (16, 8, 16, "_forward_nchw_i2c"),
+                                               (8, 32, 16, "_forward_nchw_i2c"),
+                                               (16, 16, 16, "_forward_nchw_cw"),
+                                               (32, 16, 16, "_forward_nchw_cw"),
+                                               (4, 4, 4, "_forward_nchw_cw"),
+                                               (3, 8, 1, "_forward_nchw_cw")):
+            with self.subTest(ci=ci, co=co, min_channels=min_channels):
+                conv2d = get_conv2d_cpu_layer(ci, co, min_channels)
+                self.assertEqual(conv2d.forward.__name__, expected)
+                self.assertTrue(conv2d.cw_constraints_fulfilled)
+
+    def test_min_channels_results(self):
+        """Tests that the Winograd and the i2c variants lead to the same results"""
+        x = np.random.rand(2, 16, 8, 8).astype(np.float32)
+        conv2d_i2c = get_conv2d_cpu_layer(16, 16, 32)
+        conv2d_cw = get_conv2d_cpu_layer(16, 16, 16)
+        self.assertEqual((conv2d_i2c.forward.__name__, conv2d_cw.forward.__name__),
+                         ("_forward_nchw_i2c", "_forward_nchw_cw"))
+        conv2d_cw.weights = conv2d_i2c.weights.copy()
+        conv2d_cw.biases = np.random.rand(*conv2d_i2c.biases.shape).astype(np.float32)
+        conv2d_i2c.biases = conv2d_cw.biases.copy()
+        self.assertTrue(np.allclose(conv2d_cw.forward(x), conv2d_i2c.forward(x), rtol=1e-4, atol=1e-4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -454,6 +454,51 @@ class ConvGemmTestCase(unittest.TestCase):
                                                                                         im2col_mm_result)
         self.assertTrue(np_all_close_for_all_cases)
 
+    def test_output_is_reused_for_the_same_shape(self):
+        """
+        Tests that, if no biases matrix is supplied, the returned output is overwritten by the next call with the
+        same output shape, so it must be copied to be kept
+        """
+        d = D(b=2, c=3, h=12, w=10, kn=4, kh=3, kw=3)
+        conv_gemm = ConvGemm(debug=False)
+        weights = np.random.rand(d.kn, d.c, d.kh, d.kw).astype(np.float32, order='C')
+        x1, x2 = (np.random.rand(d.b, d.c, d.h, d.w).astype(np.float32, order='C') for _ in range(2))
+        conv_gemm_results = []
+        im2col_mm_results = []
+        for x in (x1, x2):
+            conv_gemm_results.append(conv_gemm.conv_gemm_nchw(weights, x,
+                                                              vpadding=d.vpadding, hpadding=d.hpadding,
+                                                              vstride=d.vstride, hstride=d.hstride,
+                                                              vdilation=d.vdilation, hdilation=d.hdilation))
+            if x is x1:
+                kept_result = conv_gemm_results[0].copy()
+            x_c = im2col_nchw_cython(x, d.kh, d.kw, d.vpadding, d.hpadding,
+                                     d.vstride, d.hstride, d.vdilation, d.hdilation)
+            w_c = weights.reshape(d.kn, -1)
+            im2col_mm_results.append((w_c @ x_c).reshape(d.kn, d.b, d.ho, d.wo).transpose((1, 0, 2, 3)))
+        # The first output has been overwritten by the second call, only its copy keeps the first result
+        self.assertIs(conv_gemm_results[0], conv_gemm_results[1])
+        self.assertTrue(np.allclose(conv_gemm_results[0], im2col_mm_results[1]))
+        self.assertTrue(np.allclose(kept_result, im2col_mm_results[0]))
+
+    def test_with_nchw_biases_matrix(self):
+        """Tests that a (b x kn x ho x wo) biases matrix, with ho != wo, is accepted and summed to the output"""
+        d = D(b=2, c=3, h=12, w=9, kn=4, kh=3, kw=3)
+        conv_gemm = ConvGemm(debug=False)
+        weights = np.random.rand(d.kn, d.c, d.kh, d.kw).astype(np.float32, order='C')
+        x = np.random.rand(d.b, d.c, d.h, d.w).astype(np.float32, order='C')
+        biases = np.random.rand(d.b, d.kn, d.ho, d.wo).astype(np.float32, order='C')
+        x_c = im2col_nchw_cython(x, d.kh, d.kw, d.vpadding, d.hpadding,
+                                 d.vstride, d.hstride, d.vdilation, d.hdilation)
+        w_c = weights.reshape(d.kn, -1)
+        im2col_mm_result = (w_c @ x_c).reshape(d.kn, d.b, d.ho, d.wo).transpose((1, 0, 2, 3)) + biases
+        conv_gemm_result = conv_gemm.conv_gemm_nchw(weights, x, biases=biases.copy(),
+                                                    vpadding=d.vpadding, hpadding=d.hpadding,
+                                                    vstride=d.vstride, hstride=d.hstride,
+                                                    vdilation=d.vdilation, hdilation=d.hdilation)
+        self.assertEqual(conv_gemm_result.shape, (d.b, d.kn, d.ho, d.wo))
+        self.assertTrue(np.allclose(conv_gemm_result, im2col_mm_result))
+
     def test_alexnet_layers(self):
         if verbose_test():
             print_with_header("{}".format(inspect.stack()[1][3]), None)
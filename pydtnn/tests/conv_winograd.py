@@ -0,0 +1,170 @@
+"""
+Unitary tests for the numpy version of conv_winograd.py.
+
+For running all the tests quietly, execute the next command:
+    python -um unittest pydtnn.tests.ConvWinogradTestCase
+
+For running all the tests verbosely, execute the next command:
+    python -um unittest -v pydtnn.tests.ConvWinogradTestCase
+
+For running an individual test verbosely, execute the next command:
+    python -um unittest -v pydtnn.tests.ConvWinogradTestCase.test_name
+"""
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from pydtnn.backends.cpu.libs.conv_winograd import ConvWinograd
+from pydtnn.utils import PYDTNN_TENSOR_FORMAT_NCHW, PYDTNN_TENSOR_FORMAT_NHWC
+from ..cython_modules import im2col_nchw_cython
+
+
+def _conv_winograd_numpy(k, tensor_format, vstride=1, hstride=1):
+    """
+    Returns a ConvWinograd instance for a k x k kernel whose alternatives are
+    all the numpy version (the C routines are hidden while it is created).
+    """
+    with mock.patch.object(ConvWinograd, "lib_cw", object()), contextlib.redirect_stdout(io.StringIO()):
+        return ConvWinograd(k, k, vstride, hstride, 1, 1, tensor_format=tensor_format)
+
+
+def _im2col_mm(weights, x, biases=None, vpadding=0, hpadding=0):
+    """Computes the NCHW convolution using im2col and mm"""
+    kn, c, kh, kw = weights.shape
+    b, c, h, w = x.shape
+    ho = h + 2 * vpadding - kh + 1
+    wo = w + 2 * hpadding - kw + 1
+    x_c = im2col_nchw_cython(x, kh, kw, vpadding, hpadding, 1, 1, 1, 1)
+    res = weights.reshape(kn, -1) @ x_c
+    if biases is not None:
+        res += biases.reshape(-1, 1)
+    return res.reshape(kn, b, ho, wo).transpose(1, 0, 2, 3)
+
+
+class ConvWinogradTestCase(unittest.TestCase):
+    """
+    Tests that the numpy version of conv_winograd leads to the same results
+    than i2c and mm, on both NCHW and NHWC.
+    """
+
+    rng = np.random.default_rng(0)
+
+    def _random(self, *shape):
+        return self.rng.random(shape, dtype=np.float32)
+
+    def _assert_conv_winograd(self, conv_winograd, weights, x, expected, **kwargs):
+        """
+        Calls each alternative of conv_winograd with the given NCHW weights and x
+        (transposed if NHWC is used) and compares its output with the expected one.
+        """
+        k = weights.shape[2]
+        if conv_winograd.tensor_format == PYDTNN_TENSOR_FORMAT_NHWC:
+            weights = np.ascontiguousarray(weights.transpose(1, 2, 3, 0))
+            x = np.ascontiguousarray(x.transpose(0, 2, 3, 1))
+        for name, alternative in conv_winograd.alternatives[k]:
+            y = alternative(weights, x, **kwargs)
+            if conv_winograd.tensor_format == PYDTNN_TENSOR_FORMAT_NHWC:
+                y = y.transpose(0, 3, 1, 2)
+            self.assertEqual(y.shape, expected.shape, name)
+            self.assertTrue(np.allclose(y, expected, rtol=1e-4, atol=1e-4 * np.abs(expected).max()),
+                            f"{name}: max abs error {np.abs(y - expected).max()}")
+
+    def test_kernels_and_paddings(self):
+        """Tests all the (m, r) alternatives with different paddings and input sizes"""
+        for tensor_format in (PYDTNN_TENSOR_FORMAT_NCHW, PYDTNN_TENSOR_FORMAT_NHWC):
+            for k in (2, 3, 5):
+                for (h, w, vpadding, hpadding) in ((9, 9, 0, 0), (10, 7, 1, 2), (11, 8, 2, 1), (6, 13, 3, 3)):
+                    with self.subTest(tensor_format=tensor_format, k=k, h=h, w=w, padding=(vpadding, hpadding)):
+                        weights = self._random(5, 3, k, k)
+                        x = self._random(2, 3, h, w)
+                        expected = _im2col_mm(weights, x, vpadding=vpadding, hpadding=hpadding)
+                        self._assert_conv_winograd(_conv_winograd_numpy(k, tensor_format), weights, x, expected,
+                                                   vpadding=vpadding, hpadding=hpadding)
+
+    def test_raise_on_strides_and_dilations(self):
+        """Tests that strides and dilations other than 1 are rejected"""
+        for tensor_format in (PYDTNN_TENSOR_FORMAT_NCHW, PYDTNN_TENSOR_FORMAT_NHWC):
+            with self.assertRaises(NotImplementedError):
+                _conv_winograd_numpy(3, tensor_format, vstride=2, hstride=2)
+            conv_winograd = _conv_winograd_numpy(3, tensor_format)
+            weights = self._random(4, 3, 3, 3)
+            x = self._random(1, 3, 8, 8)
+            if tensor_format == PYDTNN_TENSOR_FORMAT_NHWC:
+                weights = np.ascontiguousarray(weights.transpose(1, 2, 3, 0))
+                x = np.ascontiguousarray(x.transpose(0, 2, 3, 1))
+            for name, alternative in conv_winograd.alternatives[3]:
+                with self.assertRaises(ValueError):
+                    alternative(weights, x, vstride=2, hstride=2)
+                with self.assertRaises(ValueError):
+                    alternative(weights, x, vdilation=2, hdilation=2)
+
+    def test_biases_bn_and_relu(self):
+        """Tests the fused biases, batch normalization and relu"""
+        co = 6
+        biases = self._random(co) - 0.5
+        running_mean, inv_std, gamma, beta = (self._random(co) for _ in range(4))
+        channels = (1, co, 1, 1)
+        for tensor_format in (PYDTNN_TENSOR_FORMAT_NCHW, PYDTNN_TENSOR_FORMAT_NHWC):
+            for k in (2, 3, 5):
+                weights = self._random(co, 4, k, k) - 0.5
+                x = self._random(2, 4, 10, 10)
+                y = _im2col_mm(weights, x, biases, vpadding=1, hpadding=1)
+                y_bn = (y - running_mean.reshape(channels)) * (inv_std * gamma).reshape(channels) \
+                    + beta.reshape(channels)
+                conv_winograd = _conv_winograd_numpy(k, tensor_format)
+                for relu in (False, True):
+                    with self.subTest(tensor_format=tensor_format, k=k, relu=relu):
+                        self._assert_conv_winograd(conv_winograd, weights, x, np.maximum(y, 0) if relu else y,
+                                                   biases=biases, vpadding=1, hpadding=1, relu=relu)
+                        self._assert_conv_winograd(conv_winograd, weights, x,
+                                                   np.maximum(y_bn, 0) if relu else y_bn,
+                                                   biases=biases, vpadding=1, hpadding=1, relu=relu, bn=True,
+                                                   running_mean=running_mean, inv_std=inv_std, gamma=gamma,
+                                                   beta=beta)
+
+    def test_weights_updated_in_place(self):
+        """Tests that the transformed kernel is computed again after the weights are updated in place"""
+        for tensor_format in (PYDTNN_TENSOR_FORMAT_NCHW, PYDTNN_TENSOR_FORMAT_NHWC):
+            for k in (2, 3, 5):
+                with self.subTest(tensor_format=tensor_format, k=k):
+                    conv_winograd = _conv_winograd_numpy(k, tensor_format)
+                    weights = self._random(4, 3, k, k)
+                    x = self._random(2, 3, 9, 9)
+                    nhwc = tensor_format == PYDTNN_TENSOR_FORMAT_NHWC
+                    weights_arg = np.ascontiguousarray(weights.transpose(1, 2, 3, 0)) if nhwc else weights
+                    x_arg = np.ascontiguousarray(x.transpose(0, 2, 3, 1)) if nhwc else x
+                    for name, alternative in conv_winograd.alternatives[k]:
+                        alternative(weights_arg, x_arg, vpadding=1, hpadding=1)
+                        # Same in place update as the one performed by the optimizers
+                        weights_arg -= 0.25
+                        expected = _im2col_mm(weights_arg.transpose(3, 0, 1, 2) if nhwc else weights_arg, x,
+                                              vpadding=1, hpadding=1)
+                        y = alternative(weights_arg, x_arg, vpadding=1, hpadding=1)
+                        if nhwc:
+                            y = y.transpose(0, 3, 1, 2)
+                        self.assertTrue(np.allclose(y, expected, rtol=1e-4, atol=1e-4 * np.abs(expected).max()),
+                                        f"{name}: max abs error {np.abs(y - expected).max()}")
+
+    def test_instance_reused_with_different_sizes(self):
+        """
+        Tests that an instance can be reused with different input sizes and
+        paddings, even if they lead to the same padded buffer shape
+        """
+        for tensor_format in (PYDTNN_TENSOR_FORMAT_NCHW, PYDTNN_TENSOR_FORMAT_NHWC):
+            for k in (2, 3, 5):
+                conv_winograd = _conv_winograd_numpy(k, tensor_format)
+                weights = self._random(4, 3, k, k)
+                for (h, padding) in ((12, 1), (8, 3), (10, 0), (14, 0), (12, 1), (9, 2)):
+                    with self.subTest(tensor_format=tensor_format, k=k, h=h, padding=padding):
+                        x = self._random(2, 3, h, h)
+                        expected = _im2col_mm(weights, x, vpadding=padding, hpadding=padding)
+                        self._assert_conv_winograd(conv_winograd, weights, x, expected,
+                                                   vpadding=padding, hpadding=padding)
+
+
+if __name__ == '__main__':
+    unittest.main()
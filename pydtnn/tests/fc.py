@@ -0,0 +1,65 @@
+"""
+Unitary tests for fc_cpu.py.
+
+For running all the tests quietly, execute the next command:
+    python -um unittest pydtnn.tests.FCTestCase
+
+For running all the tests verbosely, execute the next command:
+    python -um unittest -v pydtnn.tests.FCTestCase
+
+For running an individual test verbosely, execute the next command:
+    python -um unittest -v pydtnn.tests.FCTestCase.test_name
+"""
+
+import unittest
+
+import numpy as np
+
+from pydtnn.backends.cpu.layers.fc_cpu import FCCPU
+from ..model import Model, TRAIN_MODE
+
+
+class Params:
+    pass
+
+
+def get_fc_cpu_layer(batch_size, n_in, n_out, use_bias):
+    params = Params()
+    params.batch_size = batch_size
+    params.enable_best_of = False
+    model = Model(**vars(params))
+    model.mode = TRAIN_MODE
+    fc = FCCPU(shape=(n_out,), use_bias=use_bias)
+    fc.set_model(model)
+    fc.initialize(prev_shape=(n_in,))
+    if use_bias:
+        fc.biases = np.random.rand(n_out).astype(np.float32)
+    return fc
+
+
+class FCTestCase(unittest.TestCase):
+    """
+    Tests that the FC forward leads to the same results than x @ weights (+ biases).
+    """
+
+    def test_forward_with_and_without_biases(self):
+        for use_bias in (True, False):
+            with self.subTest(use_bias=use_bias):
+                fc = get_fc_cpu_layer(batch_size=8, n_in=12, n_out=5, use_bias=use_bias)
+                x = np.random.rand(8, 12).astype(np.float32)
+                expected = x @ fc.weights + fc.biases if use_bias else x @ fc.weights
+                y = fc.forward(x)
+                self.assertEqual(y.shape, (8, 5))
+                self.assertTrue(np.allclose(y, expected))
+
+    def test_biases_are_not_modified(self):
+        """Tests that the biases, which are added in place to the output, are not modified by the forward"""
+        fc = get_fc_cpu_layer(batch_size=4, n_in=6, n_out=3, use_bias=True)
+        biases = fc.biases.copy()
+        for _ in range(2):
+            fc.forward(np.random.rand(4, 6).astype(np.float32))
+        self.assertTrue(np.array_equal(fc.biases, biases))
+
+
+if __name__ == '__main__':
+    unittest.main()
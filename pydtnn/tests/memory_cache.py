@@ -0,0 +1,103 @@
+"""
+Unitary tests for memory_cache.py.
+
+For running all the tests quietly, execute the next command:
+    python -um unittest pydtnn.tests.MemoryArenaTestCase
+
+For running all the tests verbosely, execute the next command:
+    python -um unittest -v pydtnn.tests.MemoryArenaTestCase
+
+For running an individual test verbosely, execute the next command:
+    python -um unittest -v pydtnn.tests.MemoryArenaTestCase.test_name
+"""
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from pydtnn.backends.cpu.libs.conv_winograd import ConvWinograd
+from pydtnn.utils.memory_cache import MemoryArena, MemoryCache
+
+
+class MemoryArenaTestCase(unittest.TestCase):
+    """
+    Tests that MemoryArena grows its buffer when needed, reuses it otherwise,
+    and releases it when the memory cache is disabled.
+    """
+
+    def tearDown(self):
+        MemoryCache.enable()
+
+    def test_carved_arrays(self):
+        """Tests that the arrays carved on the same call have the requested shapes and do not overlap"""
+        arena = MemoryArena(np.float32)
+        shapes = ((3, 5), (7,), (2, 3, 4))
+        arrays = arena(*shapes)
+        self.assertEqual([a.shape for a in arrays], list(shapes))
+        self.assertTrue(all(a.dtype == np.float32 for a in arrays))
+        for i, a in enumerate(arrays):
+            a[...] = i
+        for i, a in enumerate(arrays):
+            self.assertTrue(np.all(a == i))
+            if i:
+                self.assertEqual((a.ctypes.data - arrays[0].ctypes.data) % MemoryArena.alignment, 0)
+
+    def test_grow_and_reuse(self):
+        """Tests that the buffer only grows for larger requests and is reused for smaller ones"""
+        arena = MemoryArena(np.float64)
+        small, = arena((4, 4))
+        large, = arena((32, 32))
+        self.assertFalse(np.shares_memory(small, large))
+        buffer = arena._buffer
+        self.assertGreaterEqual(buffer.size, 32 * 32)
+        smaller, other = arena((8, 8), (2, 2))
+        self.assertIs(arena._buffer, buffer)
+        self.assertTrue(np.shares_memory(smaller, buffer))
+        self.assertTrue(np.shares_memory(other, buffer))
+
+    def test_per_dtype(self):
+        """Tests that the arrays carved from arenas with different data types are independent"""
+        arenas = {dtype: MemoryArena(dtype) for dtype in (np.float32, np.float64, np.int8)}
+        arrays = {dtype: arena((5, 7))[0] for dtype, arena in arenas.items()}
+        for dtype, a in arrays.items():
+            self.assertEqual(a.dtype, dtype)
+            a[...] = 3
+        buffers = {dtype: arena._buffer for dtype, arena in arenas.items()}
+        arenas[np.float64]((100, 100))
+        self.assertGreaterEqual(arenas[np.float64]._buffer.size, 100 * 100)
+        self.assertIs(arenas[np.float32]._buffer, buffers[np.float32])
+        self.assertIs(arenas[np.int8]._buffer, buffers[np.int8])
+        for dtype, a in arrays.items():
+            self.assertTrue(np.all(a == 3))
+            for other_dtype, b in arrays.items():
+                if other_dtype != dtype:
+                    self.assertFalse(np.shares_memory(a, b))
+
+    def test_shared_conv_winograd_workspace(self):
+        """Tests that the ConvWinograd instances with the same data type share the same workspace"""
+        with mock.patch.object(ConvWinograd, "lib_cw", object()), contextlib.redirect_stdout(io.StringIO()):
+            conv_winograds = [ConvWinograd(k, k, 1, 1, 1, 1, dtype=np.float32) for k in (2, 3, 5)]
+        self.assertIs(conv_winograds[0].workspace, ConvWinograd._workspaces[np.float32])
+        self.assertTrue(all(cw.workspace is conv_winograds[0].workspace for cw in conv_winograds))
+
+    def test_disable(self):
+        """Tests that disabling the memory cache releases the buffer and does not keep the next ones"""
+        arena = MemoryArena(np.float32)
+        arena((64, 64))
+        self.assertGreaterEqual(arena._buffer.size, 64 * 64)
+        MemoryCache.disable()
+        self.assertEqual(arena._buffer.size, 0)
+        first, = arena((8, 8))
+        second, = arena((8, 8))
+        self.assertEqual(arena._buffer.size, 0)
+        self.assertFalse(np.shares_memory(first, second))
+        MemoryCache.enable()
+        arena((8, 8))
+        self.assertGreaterEqual(arena._buffer.size, 8 * 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
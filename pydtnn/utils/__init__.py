@@ -18,6 +18,7 @@
 #
 
 import ctypes
+import functools
 import inspect
 import math
 import os
@@ -44,6 +45,7 @@ def decode_tensor(shape, tensor_format=PYDTNN_TENSOR_FORMAT_NHWC):
         return shape
 
 
+@functools.lru_cache(maxsize=None)
 def load_library(name):
     """
     Loads an external library using ctypes.CDLL.
@@ -52,6 +54,9 @@ def load_library(name):
     not found, it traverses the LD_LIBRARY_PATH until it finds it. If it is not
     in any of the LD_LIBRARY_PATH paths, an ImportError exception is raised.
 
+    The loaded libraries are cached, so the search is only performed the first
+    time a given library is requested.
+
     Parameters
     ----------
     name : str
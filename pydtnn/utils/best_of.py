@@ -17,12 +17,14 @@
 #  with this program. If not, see <https://www.gnu.org/licenses/>.
 #
 
-import traceback
+import statistics
+import sys
 import types
+import warnings
+import weakref
 from collections import defaultdict
-from contextlib import suppress
 from timeit import default_timer as timer
-from typing import Hashable, Callable, Tuple, Union, List, Any, Dict, Optional
+from typing import Hashable, Callable, Tuple, Union, List, Any, Dict, Optional, Set
 
 import numpy as np
 from rich import box
@@ -36,6 +38,9 @@ class _BestOfExecution:
     BestOf execution object
     """
 
+    __slots__ = ('best_of', 'execution_id', 'parent', 'children', 'problem_sizes', 'name', '_blocked_by',
+                 '_current_problem_size')
+
     _names = defaultdict(lambda: 0)
     _longest_name = 0
 
@@ -57,7 +62,8 @@ class _BestOfExecution:
         _BestOfExecution._longest_name = max(_BestOfExecution._longest_name, len(self.name))
         if self.parent is not None:
             self.parent.children.append(self)
-        self._blocked_by = defaultdict(lambda: defaultdict(lambda: 50))
+        # Children executions that block this one for a given problem size, along with their blocking counters
+        self._blocked_by: Dict[Hashable, Dict[_BestOfExecution, int]] = {}
         self._current_problem_size = None
 
     def __repr__(self):
@@ -65,12 +71,13 @@ class _BestOfExecution:
 
     def block_parent(self):
         if not self.parent._is_root:
-            self.parent._blocked_by[self.parent._current_problem_size][self] = 50
+            self.parent._blocked_by.setdefault(self.parent._current_problem_size, {})[self] = 50
 
     def unblock_parent(self):
         if not self.parent._is_root:
-            with suppress(KeyError):
-                self.parent._blocked_by[self.parent._current_problem_size].pop(self)
+            blockers = self.parent._blocked_by.get(self.parent._current_problem_size)
+            if blockers is not None:
+                blockers.pop(self, None)
 
     @property
     def is_blocked(self):
@@ -83,22 +90,24 @@ class _BestOfExecution:
         It this BestOfExecution is still blocked.
         """
 
-        # warning: as the blocked_by dictionary could be modified inside the for loop, the keys() generator is first
-        #          converted to a list
-        for k in list(self._blocked_by[self._current_problem_size].keys()):
+        blockers = self._blocked_by.get(self._current_problem_size)
+        if not blockers:
+            return False
+        # warning: as the blockers dictionary could be modified inside the for loop, its keys are first copied to a list
+        for k in list(blockers):
             # Decrement blocking counter
-            self._blocked_by[self._current_problem_size][k] -= 1
+            blockers[k] -= 1
             # If the blocking counter reaches 0, release the corresponding blocker
-            if self._blocked_by[self._current_problem_size][k] <= 0:
-                self._blocked_by[self._current_problem_size].pop(k)
-        return len(self._blocked_by[self._current_problem_size]) > 0
+            if blockers[k] <= 0:
+                blockers.pop(k)
+        return len(blockers) > 0
 
     def set_problem_size(self, problem_size):
         self._current_problem_size = problem_size
         self.problem_sizes[problem_size] += 1
 
-    def print_as_table(self, time_format="6.4f"):
-        self.best_of.print_as_table(execution=self, time_format=time_format)
+    def print_as_table(self, time_format="6.4f", medians=None, speedups=None):
+        self.best_of.print_as_table(execution=self, time_format=time_format, medians=medians, speedups=speedups)
 
     @property
     def summary(self):
@@ -119,8 +128,10 @@ class _BestOfExecution:
 
     @property
     def max_speedup(self):
+        return self._get_max_speedup(self.best_of.speedups())
+
+    def _get_max_speedup(self, all_speedups):
         # Get the obtained speedups for this execution problem sizes
-        all_speedups = self.best_of.speedups()
         speedups = dict((k, all_speedups[k]) for k in self.problem_sizes.keys() if k in all_speedups)
         if not len(speedups):
             return None
@@ -133,18 +144,33 @@ class _BestOfExecution:
         return speedup / total
 
     @staticmethod
-    def _walk_nodes(node: '_BestOfExecution', tree: Tree):
+    def _walk_nodes(node: '_BestOfExecution', tree: Tree, stats_by_best_of):
         for child in node.children:
             txt = f"{child.name:{_BestOfExecution._longest_name}s}   {child.summary}"
-            max_speedup = child.max_speedup
+            max_speedup = child._get_max_speedup(stats_by_best_of[child.best_of][1])
             if max_speedup:
                 txt += f" max speedup: {max_speedup:.1f}"
             branch = tree.add(txt)
-            _BestOfExecution._walk_nodes(child, branch)
+            _BestOfExecution._walk_nodes(child, branch, stats_by_best_of)
 
-    def print_report(self):
+    @staticmethod
+    def _collect_statistics(node: '_BestOfExecution', stats_by_best_of):
+        """
+        Computes, only once for each BestOf instance found under the given node,
+        its medians and speedups, and stores them in the stats_by_best_of dictionary.
+        """
+        for child in node.children:
+            if child.best_of not in stats_by_best_of:
+                medians = child.best_of.medians()
+                stats_by_best_of[child.best_of] = (medians, child.best_of.speedups(medians))
+            _BestOfExecution._collect_statistics(child, stats_by_best_of)
+
+    def print_report(self, stats_by_best_of=None):
+        if stats_by_best_of is None:
+            stats_by_best_of = {}
+            _BestOfExecution._collect_statistics(self, stats_by_best_of)
         tree = Tree("BestOf execution graph")
-        _BestOfExecution._walk_nodes(self, tree)
+        _BestOfExecution._walk_nodes(self, tree, stats_by_best_of)
         c = Console(force_terminal=True, width=120)
         c.print(tree)
 
@@ -155,6 +181,54 @@ class _BestOfExecution:
         return self.parent is None
 
 
+class _ProblemSizeState:
+    """
+    BestOf evaluation state for a given problem size
+    """
+
+    __slots__ = ('best', 'current_round', 'current_alternative', 'times', 'counts', 'stages_times',
+                 'stages_executions', 'pruned')
+
+    def __init__(self, total_alternatives: int, stages: int, rounds: int):
+        self.best: Optional[Union[Callable, List[Callable]]] = None  # best method or pipeline, once found
+        self.current_round = 0
+        self.current_alternative = 0
+        # Ring buffer with the last recorded times of each alternative (NaN where no time has been recorded yet)
+        self.times = np.full((total_alternatives, rounds), np.nan)
+        self.counts = [0] * total_alternatives
+        self.stages_times: List[List[float]] = [[] for _ in range(stages)]
+        self.stages_executions = [0] * stages
+        self.pruned: Set[int] = set()  # alternatives that are no longer evaluated
+
+    def record(self, alternative: int, elapsed_time: float):
+        """Records the given elapsed time for the given alternative"""
+        self.times[alternative, self.counts[alternative] % self.times.shape[1]] = elapsed_time
+        self.counts[alternative] += 1
+
+    def alternative_times(self, alternative: int) -> np.ndarray:
+        """Returns the recorded times of the given alternative"""
+        return self.times[alternative, :min(self.counts[alternative], self.times.shape[1])]
+
+    def median(self, alternative: int) -> float:
+        """
+        Returns the median of the recorded times of the given alternative, or
+        infinity if none has been recorded yet. As there are only a few times,
+        statistics.median() on a list is much faster than np.median().
+        """
+        if not self.counts[alternative]:
+            return np.inf
+        return statistics.median(self.alternative_times(alternative).tolist())
+
+    def best_time(self, alternative: int) -> float:
+        """Returns the minimum of the recorded times of the given alternative"""
+        return float(self.alternative_times(alternative).min())
+
+    def reset_stages(self):
+        """Discards the stages times and executions recorded so far"""
+        self.stages_times = [[] for _ in range(len(self.stages_times))]
+        self.stages_executions = [0] * len(self.stages_executions)
+
+
 class BestOf:
     """
     Automatically executes one of a set of alternatives and eventually selects
@@ -184,9 +258,16 @@ class BestOf:
     methods that are going to be evaluated.
     """
 
+    __slots__ = ('name', 'alternatives', 'get_problem_size', 'total_rounds', 'stages', 'prune_after_round',
+                 'pruning_speedup', 'best_idx', 'best_name', 'best_method', 'best_pipeline', 'total_alternatives',
+                 '_executions', '_states', '_medians', '_dirty_medians', '_dispatch', '__weakref__')
+
     _use_first_alternative: bool = False
+    # Debug: identify each execution by its whole stack instead of by its calling frames (slower)
+    _use_whole_stack_as_execution_id: bool = False
     _current_parents: List[_BestOfExecution] = [_BestOfExecution(best_of=None, execution_id=None, parent=None)]
     _root: _BestOfExecution = _current_parents[0]
+    _instances: 'weakref.WeakSet[BestOf]' = weakref.WeakSet()
 
     def __init__(self,
                  name: str,
@@ -223,46 +304,57 @@ class BestOf:
         self.stages = stages
         self.prune_after_round = prune_after_round
         self.pruning_speedup = pruning_speedup
-        self.best_idx = defaultdict(lambda: -1)
-        self.best_name = defaultdict(lambda: 'None')
-        self.best_method: Dict[Callable] = defaultdict(lambda: None)
-        self.best_pipeline: Dict[List[Callable]] = defaultdict(lambda: None)
+        self.best_idx: Dict[Hashable, int] = {}
+        self.best_name: Dict[Hashable, str] = {}
+        self.best_method: Dict[Hashable, Callable] = {}
+        self.best_pipeline: Dict[Hashable, List[Callable]] = {}
         self.total_alternatives = len(self.alternatives)
         # Protected members
-        self._current_round = defaultdict(lambda: 0)
-        self._current_alternative = defaultdict(lambda: 0)
-        self._executions: Dict[List[_BestOfExecution]] = defaultdict(lambda: [])
-        self._times = defaultdict(self._times_arrays)
-        self._stages_times = defaultdict(self._stages_times_arrays)
-        self._stages_executions = defaultdict(lambda: [0] * self.stages)
+        # Executions indexed by their execution id and their parent execution
+        self._executions: Dict[Tuple[Hashable, _BestOfExecution], _BestOfExecution] = {}
+        self._states: Dict[Hashable, _ProblemSizeState] = {}
+        self._medians: Dict[Hashable, List[float]] = {}
+        self._dirty_medians: Set[Hashable] = set()  # problem sizes with new times since their medians were computed
         # Set __call__() for this instance
+        BestOf._instances.add(self)
         self._set_instance_call()
 
-    def _times_arrays(self) -> List[List]:
-        """Returns an array with n empty arrays, where n is the number of alternatives to be evaluated"""
-        v = []
-        for i in range(self.total_alternatives):
-            v.append([])
-        return v
+    @staticmethod
+    def _get_execution_id() -> Hashable:
+        """
+        Returns an identifier of the current execution, formed by the code
+        object and the last instruction of the frame that called this BestOf
+        instance and the code object of its calling frame. This is much cheaper
+        than extracting and formatting the whole stack.
+        """
+        frame = sys._getframe(1)
+        best_of_globals = frame.f_globals
+        # Skip the frames that belong to this module, i.e., those of the BestOf dispatch methods
+        while frame.f_globals is best_of_globals:
+            frame = frame.f_back
+        caller = frame.f_back
+        return frame.f_code, frame.f_lasti, caller.f_code if caller is not None else None
 
-    def _stages_times_arrays(self) -> List[List]:
+    @staticmethod
+    def _get_whole_stack_execution_id() -> Hashable:
         """
-        Returns an array with n arrays with m Nones each, where n is the number of
-        alternatives to be evaluated, and m is the number of stages.
+        Returns an identifier of the current execution, formed by the code
+        object and the last instruction of each frame in the stack. No source
+        lines are read and no strings are formatted.
         """
-        v = []
-        for i in range(self.stages):
-            v.append([])
-        return v
+        frame = sys._getframe(1)
+        stack = []
+        while frame is not None:
+            stack.append((frame.f_code, frame.f_lasti))
+            frame = frame.f_back
+        return tuple(stack)
 
     def _register(self, execution_id) -> _BestOfExecution:
         current_parent = self._current_parents[-1]
-        if execution_id in self._executions:
-            for execution in self._executions[execution_id]:
-                if execution.parent == current_parent:
-                    return execution
-        current_execution = _BestOfExecution(best_of=self, execution_id=execution_id, parent=current_parent)
-        self._executions[execution_id].append(current_execution)
+        current_execution = self._executions.get((execution_id, current_parent))
+        if current_execution is None:
+            current_execution = _BestOfExecution(best_of=self, execution_id=execution_id, parent=current_parent)
+            self._executions[(execution_id, current_parent)] = current_execution
         return current_execution
 
     @classmethod
@@ -272,38 +364,41 @@ class BestOf:
         deactivating any competition among the different alternatives.
         """
         cls._use_first_alternative = True
-        import gc
-        for obj in gc.get_objects():
+        for obj in list(BestOf._instances):
             if isinstance(obj, cls):
                 obj._set_instance_call()
 
     def _set_instance_call(self):
+        # The dispatch method is specialized once, so that neither the first alternative flag nor the number of
+        # stages have to be checked on each call
         if self.__class__._use_first_alternative:
-            setattr(self, "__call__", self.__call_first_alternative__)
+            if self.stages == 1:
+                # No intermediate method is needed, the first alternative is called directly
+                self._dispatch = self.alternatives[0][1]
+            else:
+                self._dispatch = self.__call_first_alternative_pipeline__
         else:
-            setattr(self, "__call__", self.__call_best__)
+            if self.stages == 1:
+                self._dispatch = self.__call_best__
+            else:
+                self._dispatch = self.__call_best_pipeline__
 
     def __call__(self, *args, **kwargs):
         """
-        __call__ is defined as an object's type. It simply calls the instance __call__.
+        __call__ is defined as an object's type. It simply calls the instance _dispatch callable.
         """
-        return self.__call__(*args, **kwargs)
+        return self._dispatch(*args, **kwargs)
 
-    def __call_first_alternative__(self, *args, **kwargs):
+    def __call_first_alternative_pipeline__(self, stage, *args, **kwargs):
         """
-        The first of the provided alternatives is called. The received
-        parameters will be passed to it and its output will be returned.
+        The given stage of the first of the provided pipelines is called. The
+        rest of the received parameters will be passed to it and its output
+        will be returned.
         """
-
-        if self.stages == 1:
-            return self.alternatives[0][1](*args, **kwargs)
-        else:
-            # Get stage and remove stage argument from args
-            args = list(args)  # Convert args to a list (so that its first element can be removed)
-            stage = int(args.pop(0))
-            assert stage < self.stages, \
-                f"The stage number ({stage}) must be less than the specified number of stages ({self.stages})."
-            return self.alternatives[0][1][stage](*args, **kwargs)
+        stage = int(stage)
+        assert stage < self.stages, \
+            f"The stage number ({stage}) must be less than the specified number of stages ({self.stages})."
+        return self.alternatives[0][1][stage](*args, **kwargs)
 
     def __call_best__(self, *args, **kwargs):
         """
@@ -311,10 +406,6 @@ class BestOf:
         methods provided as alternatives. The received parameters will be passed
         to this method and its output will be returned.
 
-        If a pipeline is being evaluated (stages > 1), the first parameter must
-        provide the current stage, and the method corresponding to that stage of
-        one of the given alternatives will be executed.
-
         Also, the execution time for a given problem size will be recorded and,
         eventually, the best method for a given problem size will be determined.
 
@@ -322,10 +413,7 @@ class BestOf:
         ----------
         args : array
             Array of arguments to be passed to the method currently being
-            evaluated. If the number of stages is greater than one, the first
-            argument must be the stage that should be executed. In this case,
-            this first argument will be removed from the array of arguments
-            passed to the evaluated method.
+            evaluated.
 
         kwargs : dictionary
             Dictionary of arguments to be passed to the method currently being
@@ -336,28 +424,74 @@ class BestOf:
         The output returned by the called method.
         """
 
-        # Get stage
-        args = list(args)  # Convert args to a list (so that its first element can be removed if in a pipeline)
-        stage = int(args.pop(0)) if self.stages > 1 else 0
+        problem_size: Any = self.get_problem_size(*args, **kwargs)
+        state = self._states.get(problem_size)
+        # If best method has been already found, call it and return
+        if state is not None and state.best is not None:
+            return state.best(*args, **kwargs)
+        return self._evaluate(0, problem_size, state, args, kwargs)
+
+    def __call_best_pipeline__(self, stage, *args, **kwargs):
+        """
+        Each time this instance is called, it will call the method corresponding
+        to the given stage of one of the different pipelines provided as
+        alternatives. The rest of the received parameters will be passed to this
+        method and its output will be returned.
+
+        Also, the execution time for a given problem size will be recorded and,
+        eventually, the best pipeline for a given problem size will be
+        determined.
+
+        Parameters
+        ----------
+        stage : int
+            The stage of the pipeline that should be executed.
+
+        args : array
+            Array of arguments to be passed to the method currently being
+            evaluated.
+
+        kwargs : dictionary
+            Dictionary of arguments to be passed to the method currently being
+            evaluated.
+
+        Returns
+        -------
+        The output returned by the called method.
+        """
+
+        stage = int(stage)
         assert stage < self.stages, \
             f"The stage number ({stage}) must be less than the specified number of stages ({self.stages})."
-        # Get problem size and current execution
         problem_size: Any = self.get_problem_size(*args, **kwargs)
-        # If best method has been already found, call it and return
-        if self.stages == 1:
-            with suppress(TypeError):
-                return self.best_method[problem_size](*args, **kwargs)
-        else:
-            with suppress(TypeError):
-                return self.best_pipeline[problem_size][stage](*args, **kwargs)
+        state = self._states.get(problem_size)
+        # If best pipeline has been already found, call its stage and return
+        if state is not None and state.best is not None:
+            return state.best[stage](*args, **kwargs)
+        return self._evaluate(stage, problem_size, state, args, kwargs)
+
+    def _evaluate(self, stage: int, problem_size: Hashable, state: Optional[_ProblemSizeState],
+                  args: tuple, kwargs: dict):
+        """
+        Calls the current alternative for the given problem size (and stage, if
+        in a pipeline), records its execution time and, when enough rounds have
+        been performed, selects the best alternative for this problem size.
+        """
+
+        if state is None:
+            state = _ProblemSizeState(self.total_alternatives, self.stages, self.total_rounds)
+            self._states[problem_size] = state
         # Get _current_execution_id and register this call
-        current_execution_id = tuple(traceback.format_list(traceback.extract_stack()))
+        if self._use_whole_stack_as_execution_id:
+            current_execution_id = self._get_whole_stack_execution_id()
+        else:
+            current_execution_id = self._get_execution_id()
         current_execution = self._register(current_execution_id)
         # Set problem size and block parent until best method is found
         current_execution.set_problem_size(problem_size)
         current_execution.block_parent()
         # Set local variables for the given problem size
-        current_alternative = self._current_alternative[problem_size]
+        current_alternative = state.current_alternative
         # Evaluate current alternative for current round
         BestOf._current_parents.append(current_execution)
         if self.stages == 1:
@@ -369,12 +503,12 @@ class BestOf:
         elapsed_time = timer() - tic
         BestOf._current_parents.pop()
         if self.stages > 1:
-            self._stages_executions[problem_size][stage] += 1
+            state.stages_executions[stage] += 1
         # Stop here if any of the current execution children have not found its best alternative yet
         if current_execution.is_blocked:
             # As the blocking is asynchronous with the stage, remove any previously recorded stage times
-            if self.stages > 1 and problem_size in self._stages_times:
-                self._stages_times.pop(problem_size)
+            if self.stages > 1:
+                state.stages_times = [[] for _ in range(self.stages)]
             # Return output
             return output
         # ---
@@ -384,11 +518,12 @@ class BestOf:
         evolve = False
         round_increment = 1
         if self.stages == 1:
-            self._times[problem_size][current_alternative].append(elapsed_time)
+            state.record(current_alternative, elapsed_time)
+            self._dirty_medians.add(problem_size)
             evolve = True
         else:
-            stages_times = self._stages_times[problem_size]
-            stages_executions = self._stages_executions[problem_size]
+            stages_times = state.stages_times
+            stages_executions = state.stages_executions
             # As the unblocking is asynchronous with the stage, only record times starting from stage 0
             if stage == 0 or len(stages_times[0]) >= 1:
                 stages_times[stage].append(elapsed_time)
@@ -400,28 +535,42 @@ class BestOf:
             stages_that_met_previous_conditions = [1 for i, x in enumerate(stages_executions)
                                                    if x == stages_executions[0] >= 1 and len(stages_times[i]) >= 1]
             if stage == self.stages - 1 and len(stages_that_met_previous_conditions) == self.stages:
-                medians_per_stage = [np.median(x) for x in stages_times]
-                pipeline_elapsed_time = np.sum(medians_per_stage)
-                self._times[problem_size][current_alternative].append(pipeline_elapsed_time)
+                medians_per_stage = [statistics.median(x) for x in stages_times]
+                pipeline_elapsed_time = sum(medians_per_stage)
+                state.record(current_alternative, pipeline_elapsed_time)
+                self._dirty_medians.add(problem_size)
                 evolve = True
                 round_increment = len(stages_times[0])
-                # Remove problem_size from self._stages_executions and self._stages_times
-                self._stages_executions.pop(problem_size)
-                self._stages_times.pop(problem_size)
+                # Start again with the stages executions and times
+                state.reset_stages()
         # If evolve:
         if evolve:
-            # 1) Evolve current alternative and round
-            next_alternative = (current_alternative + 1) % self.total_alternatives
-            current_round = self._current_round[problem_size]
-            if next_alternative == 0:
-                next_round = current_round + round_increment
-            else:
-                next_round = current_round
-            # 2) If enough rounds have been performed:
-            if next_round >= min(self.prune_after_round, self.total_rounds):
-                best_times = [np.median(x) for x in self._times[problem_size]]
+            # 1) Prune as you go: discard the alternatives whose best time is already much slower than the median
+            #    time of the fastest one so far. The best time of at least two calls is used, so that an alternative
+            #    whose first call is slow (e.g., due to cold caches) is not pruned if it is fast afterwards.
+            medians = [np.inf if i in state.pruned or not count else state.median(i)
+                       for i, count in enumerate(state.counts)]
+            leader = medians.index(min(medians))
+            threshold = medians[leader] * self.pruning_speedup
+            state.pruned.update(i for i, count in enumerate(state.counts)
+                                if count >= 2 and i != leader and i not in state.pruned
+                                and state.best_time(i) > threshold)
+            # 2) Evolve current alternative and round, skipping the pruned alternatives
+            current_round = state.current_round
+            next_alternative = current_alternative
+            next_round = current_round
+            while True:
+                next_alternative = (next_alternative + 1) % self.total_alternatives
+                if next_alternative == 0:
+                    next_round = current_round + round_increment
+                if next_alternative not in state.pruned:
+                    break
+            # 3) If enough rounds have been performed, or if only one alternative has not been pruned:
+            if next_round >= min(self.prune_after_round, self.total_rounds) \
+                    or len(state.pruned) == self.total_alternatives - 1:
+                best_times = [np.inf if i in state.pruned else state.median(i) for i in range(self.total_alternatives)]
                 min_time = min(best_times)
-                # 2.a) Prune alternatives and ensure that the next alternative is one of remaining ones
+                # 3.a) Prune alternatives and ensure that the next alternative is one of remaining ones
                 remaining_alternatives = [i for i, x in enumerate(best_times) if x <= min_time * self.pruning_speedup]
                 if next_alternative not in remaining_alternatives:
                     for i in remaining_alternatives:
@@ -432,21 +581,20 @@ class BestOf:
                         # As no remaining alternative is greater than current next one, a round has been completed
                         next_alternative = remaining_alternatives[0]
                         next_round = current_round + round_increment
-                # 2.b) Select the best method/pipeline if a new round is going to be performed and either next_round
+                # 3.b) Select the best method/pipeline if a new round is going to be performed and either next_round
                 #      is greater than total rounds or there is only one remaining alternative
                 if next_round > current_round and (next_round >= self.total_rounds or len(remaining_alternatives) == 1):
                     self.best_idx[problem_size] = best_times.index(min_time)  # first of the minimums
+                    self.best_name[problem_size], state.best = self.alternatives[self.best_idx[problem_size]]
                     if self.stages == 1:
-                        (self.best_name[problem_size],
-                         self.best_method[problem_size]) = self.alternatives[self.best_idx[problem_size]]
+                        self.best_method[problem_size] = state.best
                     else:
-                        (self.best_name[problem_size],
-                         self.best_pipeline[problem_size]) = self.alternatives[self.best_idx[problem_size]]
+                        self.best_pipeline[problem_size] = state.best
                     # Best method/pipeline set, unblock parent
                     current_execution.unblock_parent()
-            # 3) Update self._current_alternative and self._current_round for the current problem size
-            self._current_alternative[problem_size] = next_alternative
-            self._current_round[problem_size] = next_round
+            # 4) Update the current alternative and round for the current problem size
+            state.current_alternative = next_alternative
+            state.current_round = next_round
         # Return output
         return output
 
@@ -455,27 +603,31 @@ class BestOf:
         return problem_size in self.best_idx.keys()
 
     def medians(self):
+        # Only the medians of those problem sizes with new recorded times since the last call are computed
+        if len(self._dirty_medians):
+            problem_sizes = list(self._dirty_medians)
+            # Stack their NaN padded recorded times, so that their medians are computed in a single call
+            times = np.stack([self._states[k].times for k in problem_sizes])
+            with warnings.catch_warnings():
+                # The medians of the alternatives without recorded times are NaN, as expected, do not warn about them
+                warnings.simplefilter("ignore", RuntimeWarning)
+                medians = np.nanmedian(times, axis=-1)
+            self._medians.update(zip(problem_sizes, medians.tolist()))
+            self._dirty_medians.clear()
+        # Return them in the same order the problem sizes were first seen
+        return {k: self._medians[k] for k in self._states if k in self._medians}
+
+    def speedups(self, medians=None):
         out = {}
-        for problem_size, times in self._times.items():
-            medians = []
-            for i, alternative_times in enumerate(times):
-                if len(alternative_times):
-                    medians.append(np.median(alternative_times))
-                else:
-                    medians.append(np.nan)
-            out[problem_size] = medians
-        return out
-
-    def speedups(self):
-        out = {}
-        medians = self.medians()
-        for problem_size, times in self._times.items():
-            best_idx = self.best_idx[problem_size]
+        if medians is None:
+            medians = self.medians()
+        for problem_size in medians:
+            best_idx = self.best_idx.get(problem_size, -1)
             if best_idx != -1:
                 out[problem_size] = max(medians[problem_size]) / medians[problem_size][best_idx]
         return out
 
-    def print_as_table(self, execution=None, time_format="6.4f"):
+    def print_as_table(self, execution=None, time_format="6.4f", medians=None, speedups=None):
         c = Console(force_terminal=True, width=100)
         caption = self.name if execution is None else execution.name
         t = Table(box=box.HORIZONTALS, show_header=True, header_style="blue", caption=caption)
@@ -485,15 +637,17 @@ class BestOf:
         for h in [x[0] for x in self.alternatives]:
             t.add_column(str(h), justify="right")
         t.add_column("speedup", justify="right")
-        medians = self.medians()
-        speedups = self.speedups()
-        for problem_size in self._times.keys():
+        if medians is None:
+            medians = self.medians()
+        if speedups is None:
+            speedups = self.speedups(medians)
+        for problem_size in medians:
             if execution is not None and problem_size not in execution.problem_sizes:
                 continue
             row_contents = [""] * self.total_alternatives
             for i in range(len(self.alternatives)):
                 row_contents[i] = "{0:{1}}".format(medians[problem_size][i], time_format)
-            best_idx = self.best_idx[problem_size]
+            best_idx = self.best_idx.get(problem_size, -1)
             if best_idx != -1:
                 row_contents[best_idx] = "*[bold green]{}[/bold green]".format(row_contents[best_idx])
                 row_contents.append("{:.1f}".format(speedups[problem_size]))
@@ -506,18 +660,27 @@ class BestOf:
         c.print(t)
 
     @staticmethod
-    def _walk_nodes_and_print_as_table(node: _BestOfExecution):
+    def _walk_nodes_and_print_as_table(node: _BestOfExecution, stats_by_best_of):
         for child in node.children:
-            child.print_as_table()
+            medians, speedups = stats_by_best_of[child.best_of]
+            child.print_as_table(medians=medians, speedups=speedups)
             print()
-            BestOf._walk_nodes_and_print_as_table(child)
+            BestOf._walk_nodes_and_print_as_table(child, stats_by_best_of)
 
     @staticmethod
-    def print_tables():
-        BestOf._walk_nodes_and_print_as_table(BestOf._root)
+    def print_tables(stats_by_best_of=None):
+        if stats_by_best_of is None:
+            stats_by_best_of = {}
+            _BestOfExecution._collect_statistics(BestOf._root, stats_by_best_of)
+        BestOf._walk_nodes_and_print_as_table(BestOf._root, stats_by_best_of)
 
     @staticmethod
     def print_report():
-        BestOf._root.print_report()
+        if not len(BestOf._root.children):
+            return  # no BestOf instance has been evaluated, nothing to report
+        # The medians and speedups of each BestOf instance are computed once and shared by the graph and the tables
+        stats_by_best_of = {}
+        _BestOfExecution._collect_statistics(BestOf._root, stats_by_best_of)
+        BestOf._root.print_report(stats_by_best_of)
         print()
-        BestOf.print_tables()
+        BestOf.print_tables(stats_by_best_of)
@@ -24,9 +24,9 @@ from pydtnn.utils.best_of import BestOf
 
 
 def transpose_0231_numpy(original, transposed=None):
-    d0, d1, d2, d3 = original.shape
     if transposed is None:
-        transposed = np.empty((d0, d2, d3, d1), original.dtype, order="C")
+        # Allocate and copy in a single pass
+        return np.ascontiguousarray(original.transpose((0, 2, 3, 1)))
     transposed[...] = original.transpose((0, 2, 3, 1))
     return transposed
 
@@ -24,9 +24,9 @@ from pydtnn.utils.best_of import BestOf
 
 
 def transpose_0312_numpy(original, transposed=None):
-    d0, d1, d2, d3 = original.shape
     if transposed is None:
-        transposed = np.empty((d0, d3, d1, d2), original.dtype, order="C")
+        # Allocate and copy in a single pass
+        return np.ascontiguousarray(original.transpose((0, 3, 1, 2)))
     transposed[...] = original.transpose((0, 3, 1, 2))
     return transposed
 
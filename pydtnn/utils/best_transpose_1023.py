@@ -24,9 +24,9 @@ from pydtnn.utils.best_of import BestOf
 
 
 def transpose_1023_numpy(original, transposed=None):
-    d0, d1, d2, d3 = original.shape
     if transposed is None:
-        transposed = np.empty((d1, d0, d2, d3), original.dtype, order="C")
+        # Allocate and copy in a single pass
+        return np.ascontiguousarray(original.transpose((1, 0, 2, 3)))
     transposed[...] = original.transpose((1, 0, 2, 3))
     return transposed
 
@@ -54,5 +54,5 @@ best_transpose_1023 = BestOf(
         ("jik_cyt", transpose_1023_jik_cython_wrapper),
         ("numpy", transpose_1023_numpy),
     ],
-    get_problem_size=lambda m: m.shape,
+    get_problem_size=lambda *args: args[0].shape,
 )
@@ -17,6 +17,10 @@
 #  with this program. If not, see <https://www.gnu.org/licenses/>.
 #
 
+import math
+
+import numpy as np
+
 
 class MemoryCache(dict):
     """
@@ -26,8 +30,9 @@ class MemoryCache(dict):
     * The provided factory function receives key as a parameter (which allows
       the generated value to depend on the given key).
 
-    * If disable() is called, the instances of this class will clear their
-      already stored values and will not store the next ones.
+    * If disable() is called, the instances of this class (and those of
+      MemoryArena) will clear their already stored values and will not store
+      the next ones.
 
     """
     _preserve_values = True
@@ -50,9 +55,45 @@ class MemoryCache(dict):
         cls._preserve_values = False
         import gc
         for obj in gc.get_objects():
-            if isinstance(obj, cls):
+            if isinstance(obj, (cls, MemoryArena)):
                 obj.clear()
 
     @classmethod
     def enable(cls):
         cls._preserve_values = True
+
+
+class MemoryArena:
+    """
+    Growable buffer from which the scratch arrays that are used at the same
+    time are carved, instead of keeping one cached array per kind and shape.
+
+    The arrays returned by a call are only valid until the next call, as they
+    share the same underlying buffer. Their contents are not initialized.
+
+    As with MemoryCache, if MemoryCache.disable() is called, the current
+    buffer is released and the next ones will not be kept between calls.
+    """
+
+    alignment = 64  # Offset alignment (in bytes) of each carved array
+
+    def __init__(self, dtype):
+        self.dtype = np.dtype(dtype)
+        self._buffer = np.empty(0, self.dtype)
+
+    def __call__(self, *shapes):
+        step = max(self.alignment // self.dtype.itemsize, 1)
+        sizes = [math.prod(shape) for shape in shapes]
+        offsets = [0]
+        for size in sizes:
+            offsets.append(offsets[-1] + -(-size // step) * step)
+        buffer = self._buffer
+        if buffer.size < offsets[-1] or not MemoryCache._preserve_values:
+            buffer = np.empty(offsets[-1], self.dtype)
+            if MemoryCache._preserve_values:
+                self._buffer = buffer
+        return [buffer[offset:offset + size].reshape(shape) for shape, offset, size in zip(shapes, offsets, sizes)]
+
+    def clear(self):
+        """Releases the current buffer"""
+        self._buffer = np.empty(0, self.dtype)